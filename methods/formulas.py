@@ -97,3 +97,61 @@ class veryBad(RungeKutta):
                      [0,1/2,0,0],[0,0,1,0]])
         B=vector(AA,[1/6,2/6,2/6,1/6])
         super().__init__(A,B,title)
+class DormandPrince(RungeKutta):
+    def __init__(self):
+        title="Dormand-Prince 5(4) embedded pair"
+        # See Hairer, Norsett and Wanner I, page 178.
+        A=matrix(AA,7,7)
+        A[1,0]=1/AA(5)
+        A[2,0]=3/AA(40)
+        A[2,1]=9/AA(40)
+        A[3,0]=44/AA(45)
+        A[3,1]=-56/AA(15)
+        A[3,2]=32/AA(9)
+        A[4,0]=19372/AA(6561)
+        A[4,1]=-25360/AA(2187)
+        A[4,2]=64448/AA(6561)
+        A[4,3]=-212/AA(729)
+        A[5,0]=9017/AA(3168)
+        A[5,1]=-355/AA(33)
+        A[5,2]=46732/AA(5247)
+        A[5,3]=49/AA(176)
+        A[5,4]=-5103/AA(18656)
+        A[6,0]=35/AA(384)
+        A[6,2]=500/AA(1113)
+        A[6,3]=125/AA(192)
+        A[6,4]=-2187/AA(6784)
+        A[6,5]=11/AA(84)
+        # order 5 (the last stage is the first of the next step):
+        B=vector(AA,[35/AA(384),0,500/AA(1113),125/AA(192),-2187/AA(6784),
+                     11/AA(84),0])
+        # embedded, order 4:
+        Bhat=vector(AA,[5179/AA(57600),0,7571/AA(16695),393/AA(640),
+                        -92097/AA(339200),187/AA(2100),1/AA(40)])
+        super().__init__(A,B,title,Bhat=Bhat)
+class Fehlberg(RungeKutta):
+    def __init__(self):
+        title="Runge-Kutta-Fehlberg 4(5) embedded pair"
+        # See Hairer, Norsett and Wanner I, page 177.
+        A=matrix(AA,6,6)
+        A[1,0]=1/AA(4)
+        A[2,0]=3/AA(32)
+        A[2,1]=9/AA(32)
+        A[3,0]=1932/AA(2197)
+        A[3,1]=-7200/AA(2197)
+        A[3,2]=7296/AA(2197)
+        A[4,0]=439/AA(216)
+        A[4,1]=-8
+        A[4,2]=3680/AA(513)
+        A[4,3]=-845/AA(4104)
+        A[5,0]=-8/AA(27)
+        A[5,1]=2
+        A[5,2]=-3544/AA(2565)
+        A[5,3]=1859/AA(4104)
+        A[5,4]=-11/AA(40)
+        # order 4:
+        B=vector(AA,[25/AA(216),0,1408/AA(2565),2197/AA(4104),-1/AA(5),0])
+        # embedded, order 5:
+        Bhat=vector(AA,[16/AA(135),0,6656/AA(12825),28561/AA(56430),
+                        -9/AA(50),2/AA(55)])
+        super().__init__(A,B,title,Bhat=Bhat)
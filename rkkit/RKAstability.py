@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+r"""
+A-stability, without computing roots in QQbar.
+
+A method whose stability function is R = P/Q is A-stable iff (see HW II,
+second edition, page 43):
+
+- E(y) = |Q(iy)|^2 - |P(iy)|^2 is nonnegative on the real line,
+
+- the poles of R (the roots of Q) are in the right half plane.
+
+E is a polynomial with real coefficients (see imaginary_axis_split in
+RKPolutilities): its sign is studied with Sturm sequences. The location
+of the roots of Q is obtained by the Routh-Hurwitz theorem (a Cauchy index,
+computed with a Sturm sequence). All computations are done in the field of
+the coefficients (QQ, a number field, or AA): only signs of its elements
+are computed in AA.
+
+Polynomials are univariate polynomials over a real field K; when K is a
+number field, 'embedding' is its embedding in QQbar (see RKFields).
+"""
+from sage.all import *
+from .RKFields import to_AA
+from .RKPolutilities import squared_module_on_imaginary_axis, \
+    imaginary_axis_split
+#
+def _sgn(c,embedding=None):
+    # sign of the (real) element c of K.
+    if c == 0:
+        return 0
+    return to_AA(c,embedding).sign()
+def sturm_sequence(p,q=None):
+    """
+    The Sturm sequence p, q, -rem(p,q), ... (q = p' by default).
+    """
+    if q is None:
+        q = p.derivative()
+    seq = [p]
+    while not q.is_zero():
+        seq.append(q)
+        p,q = q,-(p % q)
+    return seq
+def sign_variations(signs):
+    """
+    Number of sign changes in a list of signs (zeros are ignored).
+    """
+    s = [x for x in signs if x != 0]
+    return len([k for k in range(0,len(s)-1) if s[k] != s[k+1]])
+def _variations(seq,x,embedding):
+    # sign variations of the sequence at x (x = +oo or -oo allowed).
+    if x == +Infinity:
+        return sign_variations([_sgn(p.leading_coefficient(),embedding)
+                                for p in seq])
+    elif x == -Infinity:
+        return sign_variations([_sgn(p.leading_coefficient(),embedding)*
+                                (-1)**p.degree() for p in seq])
+    return sign_variations([_sgn(p(x),embedding) for p in seq])
+def number_of_real_roots(p,a=-Infinity,b=+Infinity,embedding=None):
+    """
+    Number of distinct real roots of p in (a,b] (Sturm's theorem).
+    """
+    if p.degree() <= 0:
+        return 0
+    seq = sturm_sequence(p)
+    return _variations(seq,a,embedding)-_variations(seq,b,embedding)
+def cauchy_index(num,den,embedding=None):
+    r"""
+    Cauchy index of num/den on the real line: number of jumps of num/den
+    from -\infty to +\infty, minus number of jumps from +\infty to -\infty.
+    """
+    seq = sturm_sequence(den,num % den)
+    return _variations(seq,-Infinity,embedding)- \
+        _variations(seq,+Infinity,embedding)
+def is_nonnegative_on_real_line(E,embedding=None):
+    """
+    Is the polynomial E nonnegative on the real line ? (E has no real
+    root of odd multiplicity, and a positive leading coefficient).
+    """
+    if E.is_zero():
+        return True
+    if _sgn(E.leading_coefficient(),embedding) < 0:
+        return False
+    return number_of_real_roots(odd_multiplicity_part(E),
+                                embedding=embedding) == 0
+def odd_multiplicity_part(E):
+    """
+    The product of the irreducible factors of E of odd multiplicity.
+    """
+    # S[k] = product of the factors of multiplicity > k:
+    S = []
+    g = E
+    while g.degree() > 0:
+        d = g.gcd(g.derivative())
+        S.append(g // d)
+        g = d
+    S.append(E.parent()(1))
+    return prod([S[k] // S[k+1] for k in range(0,len(S)-1,2)],
+                E.parent()(1))
+def roots_in_half_planes(Q,embedding=None):
+    """
+    Return the numbers of distinct roots of Q (with real coefficients) in
+    the open left half plane, in the open right half plane, and on the
+    imaginary axis.
+
+    The roots z of Q such that -z is also a root (this includes the roots
+    on the imaginary axis) are the roots of H = gcd(Q(z),Q(-z)), which is
+    even or odd; the other roots are located by the Routh-Hurwitz theorem.
+    """
+    R = Q.parent()
+    if Q.degree() <= 0:
+        return 0,0,0
+    Qs = Q // Q.gcd(Q.derivative())
+    c = Qs.list()
+    H = Qs.gcd(R([c[k]*(-1)**k for k in range(0,len(c))]))
+    Q1 = Qs // H
+    # Routh-Hurwitz: Q1(iy) = U(y) + i V(y).
+    n1 = Q1.degree()
+    U,V = imaginary_axis_split(Q1)
+    if n1%2 == 0:
+        d = -cauchy_index(V,U,embedding)
+    else:
+        d = cauchy_index(U,V,embedding)
+    nleft = (n1+d)//2
+    nright = (n1-d)//2
+    # H(z) = z^e h(z^2): roots on the imaginary axis are 0 (if e == 1) and
+    # the +/- sqrt(w) for the negative roots w of h.
+    h = H.list()
+    e = 1 if h[0] == 0 else 0
+    h = R([h[k] for k in range(e,len(h),2)])
+    naxis = e+2*number_of_real_roots(h,-Infinity,0,embedding)
+    m = (H.degree()-naxis)//2
+    return nleft+m,nright+m,naxis
+def E_polynomial(P,Q):
+    """
+    E(y) = |Q(iy)|^2 - |P(iy)|^2, for P and Q with real coefficients.
+    """
+    return squared_module_on_imaginary_axis(Q)- \
+        squared_module_on_imaginary_axis(P)
+def is_A_stable(P,Q,embedding=None):
+    """
+    Is the method of stability function P/Q A-stable ?
+    """
+    return is_nonnegative_on_real_line(E_polynomial(P,Q),embedding) and \
+        roots_in_half_planes(Q,embedding)[0] == 0
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Cache for the properties computed by RKformula.
+
+Entries are keyed by the name of the property *and* its arguments; each
+entry records the time spent to compute it and an estimate of its size.
+The cache can be bounded (number of entries and/or estimated bytes): the
+least recently used entries are then dropped, and will be recomputed if
+needed again. Hits and misses are counted for each property.
+"""
+import sys
+from collections import OrderedDict
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+#
+def property_key(name,args=(),kwargs={}):
+    """
+    Key of a property: its name, followed by its arguments, if any.
+
+    EXAMPLES::
+
+    sage: property_key("order")
+    'order'
+    sage: property_key("make_order_equations",(3,))
+    'make_order_equations(3)'
+    """
+    if not args and not kwargs:
+        return name
+    la = [repr(a) for a in args]+[k+"="+repr(kwargs[k])
+                                  for k in sorted(kwargs)]
+    return name+"("+",".join(la)+")"
+def estimate_size(x,_depth=0):
+    """
+    A (rough) estimate of the memory used by x, in bytes.
+    """
+    size = sys.getsizeof(x)
+    if _depth > 4:
+        return size
+    if isinstance(x,dict):
+        return size+sum(estimate_size(k,_depth+1)+estimate_size(v,_depth+1)
+                        for k,v in x.items())
+    if isinstance(x,(list,tuple,set,frozenset)):
+        return size+sum(estimate_size(v,_depth+1) for v in x)
+    # Sage objects: matrices, vectors, polynomials, rational functions.
+    try:
+        if hasattr(x,"nrows") and hasattr(x,"ncols"):
+            return size+x.nrows()*x.ncols()*estimate_size(x[0,0],_depth+1)
+        if hasattr(x,"numerator") and hasattr(x,"denominator") and \
+           hasattr(x.numerator(),"coefficients"):
+            return size+estimate_size(x.numerator().coefficients(),_depth+1)\
+                +estimate_size(x.denominator().coefficients(),_depth+1)
+        if hasattr(x,"coefficients") and callable(x.coefficients):
+            return size+estimate_size(x.coefficients(),_depth+1)
+    except Exception:
+        pass
+    return size
+#
+class CacheEntry(object):
+    """
+    A cached value, with the time spent to compute it and its size.
+    """
+    __slots__ = ["value","time","size"]
+    def __init__(self,value,time=0.,size=0):
+        self.value = value
+        self.time = time
+        self.size = size
+#
+class PropertyCache(MutableMapping):
+    """
+    Bounded, argument aware, cache of properties (a mapping key -> value).
+
+    maxentries: maximum number of entries (None: no limit).
+
+    maxbytes: maximum (estimated) total size of the entries (None: no limit).
+
+    EXAMPLES::
+
+    sage: F = RKformula(RK4(),cache_bytes=10**8)
+    sage: F.order()
+    sage: F.known_properties.stats()
+    """
+    def __init__(self,maxentries=None,maxbytes=None):
+        self.maxentries = maxentries
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = {}
+        self.misses = {}
+        self.times = {}
+    # Mapping interface (does not change statistics):
+    def __getitem__(self,key):
+        return self.entries[key].value
+    def __setitem__(self,key,value):
+        self.store(key,key,value)
+    def __delitem__(self,key):
+        e = self.entries.pop(key)
+        self.nbytes-= e.size
+    def __iter__(self):
+        return iter(list(self.entries))
+    def __len__(self):
+        return len(self.entries)
+    def __contains__(self,key):
+        return key in self.entries
+    #
+    def lookup(self,name,key):
+        """
+        Return (True, value) if key is known, (False, None) otherwise;
+        count a hit or a miss for the property 'name'.
+        """
+        if key in self.entries:
+            self.hits[name] = self.hits.get(name,0)+1
+            self.entries.move_to_end(key)
+            return True,self.entries[key].value
+        self.misses[name] = self.misses.get(name,0)+1
+        return False,None
+    def store(self,name,key,value,elapsed=0.):
+        """
+        Store value under key (computed in 'elapsed' seconds), and evict the
+        least recently used entries if the cache is too large.
+        """
+        if key in self.entries:
+            del self[key]
+        e = CacheEntry(value,elapsed,estimate_size(value))
+        self.entries[key] = e
+        self.nbytes+= e.size
+        self.times[name] = self.times.get(name,0.)+elapsed
+        self._evict()
+    def _evict(self):
+        while len(self.entries) > 1 and \
+              ((self.maxentries is not None and \
+                len(self.entries) > self.maxentries) or \
+               (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+            k,e = self.entries.popitem(last=False)
+            self.nbytes-= e.size
+    def entry(self,key):
+        """
+        The CacheEntry (value, time, size) stored under key.
+        """
+        return self.entries[key]
+    def stats(self):
+        """
+        Return a dictionary: property name -> (hits, misses, total time spent
+        to compute it).
+        """
+        names = set(self.hits)|set(self.misses)|set(self.times)
+        return dict((n,(self.hits.get(n,0),self.misses.get(n,0),
+                        self.times.get(n,0.))) for n in names)
+    def print_stats(self):
+        """
+        Print the statistics, most expensive properties first.
+        """
+        S = self.stats()
+        for n in sorted(S,key=lambda n: -S[n][2]):
+            print("-> ",n," : hits=",S[n][0]," misses=",S[n][1],
+                  " time=%.3fs"%S[n][2])
+        print("entries: ",len(self.entries)," estimated size: ",self.nbytes)
@@ -71,3 +71,39 @@ class CollocPointNotGood(Exception):
         self.t=t
     def __str__(self):
         return self.t
+class ImplicitMethod(Exception):
+    """
+    Raised if an implicit method is used where an explicit one is needed.
+    """
+    def __init__(self,t):
+        self.t=t
+    def __str__(self):
+        return "the method "+self.t+" is implicit"
+class NewtonDidNotConverge(Exception):
+    """
+    Raised when the Newton iterations for the stages of an implicit method
+    do not converge (even with a new Jacobian).
+    """
+    def __init__(self,t):
+        self.t=t
+    def __str__(self):
+        return "Newton iterations did not converge at t= "+str(self.t)
+class NoEmbeddedMethod(Exception):
+    """
+    Raised if the embedded weights (Bhat) of a method are needed, but the
+    method has none.
+    """
+    def __init__(self,t):
+        self.t=t
+    def __str__(self):
+        return "the method "+self.t+" has no embedded method"
+class NoContinuousExtension(Exception):
+    """
+    Raised if a method has no continuous extension of the requested order.
+    """
+    def __init__(self,t,order):
+        self.t=t
+        self.order=order
+    def __str__(self):
+        return "the method "+self.t+" has no continuous extension of order "\
+            +str(self.order)
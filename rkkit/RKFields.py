@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Find the smallest exact field containing the coefficients of a method.
+
+Computing in AA is always possible, but AA's arithmetic is lazy, and pays
+for it at each comparison; computing in QQ, or in a number field, is much
+faster. We only go back to AA (or QQbar) when we need a real ordering or
+roots of polynomials.
+"""
+from sage.all import *
+#
+def smallest_exact_field(entries):
+    """
+    Return (K, elements, embedding): K is QQ if all the entries are
+    rational, else a number field containing all of them; elements are the
+    entries as elements of K, and embedding is the morphism from K to QQbar
+    which maps them back to the entries (None if K is QQ).
+
+    EXAMPLES::
+
+    sage: smallest_exact_field([AA(1/2),AA(3)])
+    (Rational Field, [1/2, 3], None)
+    sage: K,e,h = smallest_exact_field([AA(sqrt(6))/36, 1/AA(9)])
+    sage: K
+    Number Field in a with defining polynomial y^2 - 6 ...
+    """
+    entries = list(entries)
+    try:
+        return QQ,[QQ(e) for e in entries],None
+    except (TypeError,ValueError):
+        pass
+    K,elements,hom = number_field_elements_from_algebraics(
+        [QQbar(e) for e in entries],minimal=True)
+    return K,elements,hom
+def to_AA(x,embedding):
+    """
+    The element x of K, as a real algebraic number.
+    """
+    if embedding is None:
+        return AA(x)
+    return AA(embedding(x))
+def to_QQbar(x,embedding):
+    """
+    The element x of K, as an algebraic number.
+    """
+    if embedding is None:
+        return QQbar(x)
+    return embedding(x)
@@ -48,3 +48,36 @@ def roots_checked(pol,R):
     n = sum([s[1] for s in rac])
     return rac,pol.degree()== n, n
 
+def imaginary_axis_split(P):
+    """
+    For a polynomial P with real coefficients, return the polynomials
+    (with real coefficients) Pe and Po such that P(iy) = Pe(y) + i Po(y).
+
+    Pe (resp. Po) is made of the even (resp. odd) coefficients of P, with
+    alternating signs: no complex number is involved.
+    """
+    c = P.list()
+    R = P.parent()
+    Pe = R([c[k] if k%4 == 0 else -c[k] if k%4 == 2 else 0
+            for k in range(0,len(c))])
+    Po = R([c[k] if k%4 == 1 else -c[k] if k%4 == 3 else 0
+            for k in range(0,len(c))])
+    return Pe,Po
+def squared_module_on_imaginary_axis(P):
+    """
+    For a polynomial P with real coefficients, return the polynomial
+    |P(iy)|^2 = Pe(y)^2 + Po(y)^2 (see imaginary_axis_split), with
+    coefficients in the base ring of P.
+
+    For a rational function R = N/D, |R(iy)|^2 is the quotient of
+    squared_module_on_imaginary_axis(N) by
+    squared_module_on_imaginary_axis(D).
+
+    EXAMPLES::
+
+    sage: z = QQ['z'].gen()
+    sage: squared_module_on_imaginary_axis(1+z/2+z^2/12)
+    1/144*z^4 + 1/12*z^2 + 1
+    """
+    Pe,Po = imaginary_axis_split(P)
+    return Pe**2+Po**2
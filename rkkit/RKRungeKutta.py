@@ -4,11 +4,20 @@ class RungeKutta(SageObject):
     """
     Base class for all Runge-Kutta methods.
 
+    Coefficients must be exact, unless exact=False (such methods can only
+    be screened, see RKscreening).
+
+    Bhat: the weights of an embedded method (same A, other weights), used
+    to estimate the error (optional).
+
+    Btheta: the weights b_j(theta) of a continuous extension (a list of
+    polynomials in theta, with b_j(1) = B[j]), optional (see
+    RKformula.dense_output_weights).
     """
-    def __init__(self,A,B,Title,C=[]):
-        if not A.parent().is_exact():
+    def __init__(self,A,B,Title,C=[],exact=True,Bhat=None,Btheta=None):
+        if exact and not A.parent().is_exact():
             raise MustBeExact("RungeKutta: parent of A is not exact")
-        if not  B.parent().is_exact():
+        if exact and not  B.parent().is_exact():
             raise MustBeExact("RungeKutta: parent of B is not exact")
         if not isinstance(A,sage.structure.element.Matrix):
             raise NotA("RungeKutta: A is not a matrix")
@@ -19,11 +28,27 @@ class RungeKutta(SageObject):
             raise  DimensionsAreIncompatible(A,B,C)
         if C != [] and len(C) != A.dimensions()[0]:
             raise DimensionsAreIncompatible(A,B,C)
+        if Bhat is not None:
+            if exact and not Bhat.parent().is_exact():
+                raise MustBeExact("RungeKutta: parent of Bhat is not exact")
+            if not isinstance(Bhat,sage.structure.element.Vector):
+                raise NotA("RungeKutta: Bhat is not a vector")
+            if len(Bhat) != len(B):
+                raise DimensionsAreIncompatible(A,Bhat,C)
+        if Btheta is not None and len(Btheta) != len(B):
+            raise DimensionsAreIncompatible(A,Btheta,C)
             
         
         self.A = A
         self.B = B
         self.Title = Title
         self.C = C
+        self.Bhat = Bhat
+        self.Btheta = Btheta
+        self.exact = A.parent().is_exact() and B.parent().is_exact() and \
+            (Bhat is None or Bhat.parent().is_exact())
     def __str__(self):
-        return self.Title+"\n"+str(self.A)+"\n"+str(self.B)
+        ret = self.Title+"\n"+str(self.A)+"\n"+str(self.B)
+        if self.Bhat is not None:
+            ret+= "\n"+str(self.Bhat)
+        return ret
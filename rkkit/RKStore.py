@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent (on disk) store of the properties computed by RKformula.
+
+Properties are keyed by a canonical hash of the exact Butcher array (A,B,C)
+and by the property key (see RKCache.property_key); values are serialized
+with Sage's dumps/loads, so that exact values (AA, QQbar, rational
+functions...) are restored exactly. The store is a sqlite database, which
+several worker processes can read and write at the same time.
+
+EXAMPLES::
+
+sage: S = PropertyStore("/tmp/rkkit.db")
+sage: F = RKformula(Radau5(),store=S)
+sage: F.compute_all_properties()  # computed, and written to the store.
+sage: G = RKformula(Radau5(),store=S)
+sage: G.compute_all_properties()  # read from the store.
+
+The store can also be enabled for all the RKformula by setting the
+environment variable RKKIT_STORE to the path of the database.
+"""
+from sage.all import *
+import os
+import hashlib
+import sqlite3
+#
+STORE_VERSION = 1
+#
+def canonical_string(a):
+    """
+    A canonical string for the real algebraic number a: the number itself
+    if it is rational, else its minimal polynomial and the rank of a among
+    the real roots of this polynomial.
+    """
+    a = AA(a)
+    p = a.minpoly()
+    if p.degree() == 1:
+        return str(-p[0])
+    roots = sorted(p.roots(AA,multiplicities=False))
+    return str(p)+"#"+str(roots.index(a))
+def tableau_hash(A,B,C=[],Bhat=None):
+    """
+    Canonical hash of the exact Butcher array (A,B,C), and of the embedded
+    weights Bhat, if any.
+    """
+    h = hashlib.sha256()
+    h.update(("rkkit-store-"+str(STORE_VERSION)).encode())
+    h.update(("|A%dx%d:"%(A.nrows(),A.ncols())).encode())
+    h.update(";".join(canonical_string(a) for a in A.list()).encode())
+    h.update("|B:".encode())
+    h.update(";".join(canonical_string(b) for b in B).encode())
+    h.update("|C:".encode())
+    h.update(";".join(canonical_string(c) for c in C).encode())
+    if Bhat is not None:
+        h.update("|Bhat:".encode())
+        h.update(";".join(canonical_string(b) for b in Bhat).encode())
+    return h.hexdigest()
+#
+class PropertyStore(SageObject):
+    """
+    A sqlite database of properties: (tableau hash, property key) -> value.
+    """
+    def __init__(self,path):
+        self.path = path
+        self._db = None
+        self._pid = None
+    def _connection(self):
+        # one connection per process (connections must not cross a fork).
+        if self._db is None or self._pid != os.getpid():
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d,exist_ok=True)
+            db = sqlite3.connect(self.path,timeout=60)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS properties ("
+                       "hash TEXT, key TEXT, value BLOB, "
+                       "PRIMARY KEY (hash,key))")
+            db.commit()
+            self._db = db
+            self._pid = os.getpid()
+        return self._db
+    def get(self,h,key):
+        """
+        Return (True, value) if the property 'key' of the tableau of hash h
+        is in the store, (False, None) otherwise.
+        """
+        row = self._connection().execute(
+            "SELECT value FROM properties WHERE hash=? AND key=?",
+            (h,key)).fetchone()
+        if row is None:
+            return False,None
+        try:
+            return True,loads(bytes(row[0]))
+        except Exception:
+            return False,None
+    def put(self,h,key,value):
+        """
+        Write the property 'key' of the tableau of hash h. Values which
+        cannot be serialized are silently ignored.
+        """
+        try:
+            blob = dumps(value)
+        except Exception:
+            return
+        db = self._connection()
+        with db:
+            db.execute("INSERT OR REPLACE INTO properties VALUES (?,?,?)",
+                       (h,key,sqlite3.Binary(blob)))
+    def keys(self,h):
+        """
+        The keys of the properties stored for the tableau of hash h.
+        """
+        return [r[0] for r in self._connection().execute(
+            "SELECT key FROM properties WHERE hash=?",(h,))]
+def default_store():
+    """
+    The store given by the environment variable RKKIT_STORE, if any.
+    """
+    path = os.environ.get("RKKIT_STORE")
+    if path:
+        return PropertyStore(path)
+    return None
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+r"""
+A persistent catalog of the rooted trees (see RKTreeTables).
+
+The trees with 1, 2, ... ,maxorder nodes, with their parent arrays, gamma and
+sigma, are computed once and saved in a binary file, which is then
+memory-mapped: later processes just read the (shared) pages they need.
+
+File format (little endian):
+
+- header: magic b"RKTREES\0", version (uint32), maxorder (uint32),
+
+- for each order n = 1 ... maxorder: n (uint32), number of trees (uint32),
+  offset of the block of order n (uint64),
+
+- block of order n: levels (int8, ntrees*n), parents (int8, ntrees*n),
+  padding to a multiple of 8, gamma (int64, ntrees), sigma (int64, ntrees).
+
+The catalog file is given by the environment variable RKKIT_TREE_CATALOG,
+and its maximum order by RKKIT_TREE_CATALOG_ORDER (default: 12); the default
+file is in $XDG_CACHE_HOME/rkkit (~/.cache/rkkit). With RKKIT_TREE_CATALOG
+set to "none", no file is used (the same for TreeCatalog(path="none"), or
+set_default_catalog("none")): the trees are computed in memory. They are
+also kept in memory when the file cannot be written.
+"""
+import os
+import sys
+import mmap
+import struct
+import tempfile
+from .RKTreeTables import TreeTable
+#
+VERSION = 1
+MAGIC = b"RKTREES\0"
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<IIQ")
+DEFAULT_MAXORDER = 12
+NO_FILE = "none"
+#
+def default_catalog_path(maxorder=DEFAULT_MAXORDER):
+    """
+    Return the default path of the catalog file (NO_FILE: no file).
+    """
+    path = os.environ.get("RKKIT_TREE_CATALOG")
+    if path:
+        return path
+    cache = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"),".cache")
+    return os.path.join(cache,"rkkit",
+                        "trees-v"+str(VERSION)+"-"+str(maxorder)+".bin")
+def _catalog_size(maxorder,ntrees):
+    # size of the catalog file, ntrees[n-1] being the number of trees with
+    # n nodes.
+    size = _HEADER.size+maxorder*_ENTRY.size
+    for n in range(1,maxorder+1):
+        size+= 2*ntrees[n-1]*n
+        size+= (-(2*ntrees[n-1]*n))%8+16*ntrees[n-1]
+    return size
+def write_catalog(path,maxorder=DEFAULT_MAXORDER,tables=None):
+    """
+    Compute the trees up to order maxorder (if the list of their tables is
+    not given) and write the catalog file (atomically: concurrent writers
+    can only replace a complete file by another complete file).
+    """
+    if tables is None:
+        tables = [TreeTable(n) for n in range(1,maxorder+1)]
+    offset = _HEADER.size+maxorder*_ENTRY.size
+    entries = []
+    blocks = []
+    for T in tables:
+        block = bytearray()
+        block+= T.levels.tobytes()
+        block+= T.parents.tobytes()
+        block+= bytes((-len(block))%8)
+        block+= struct.pack("<%dq"%T.ntrees,*T.gamma)
+        block+= struct.pack("<%dq"%T.ntrees,*T.sigma)
+        entries.append(_ENTRY.pack(T.n,T.ntrees,offset))
+        blocks.append(block)
+        offset+= len(block)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory,exist_ok=True)
+    fd,tmp = tempfile.mkstemp(dir=directory,prefix=".trees-")
+    try:
+        with os.fdopen(fd,"wb") as f:
+            f.write(_HEADER.pack(MAGIC,VERSION,maxorder))
+            for e in entries:
+                f.write(e)
+            for b in blocks:
+                f.write(b)
+        os.chmod(tmp,0o644)
+        os.replace(tmp,path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return tables
+#
+class TreeCatalog(object):
+    r"""
+    Lazily loaded catalog of rooted trees.
+
+    table(n) returns the TreeTable of the trees with n nodes: read from the
+    memory-mapped catalog file if n <= maxorder (the file is generated the
+    first time it is needed), computed otherwise. If there is no file
+    (path NO_FILE), or if it cannot be written, the tables are computed in
+    memory.
+
+    EXAMPLES::
+
+    sage: C = TreeCatalog()
+    sage: C.table(8).ntrees
+    115
+    """
+    def __init__(self,path=None,maxorder=None):
+        if maxorder is None:
+            maxorder = int(os.environ.get("RKKIT_TREE_CATALOG_ORDER",
+                                          DEFAULT_MAXORDER))
+        self.maxorder = maxorder
+        self.path = path if path is not None else \
+            default_catalog_path(maxorder)
+        self.tables = {}
+        self._mm = None
+        self._failed = False
+    def _valid(self,mm):
+        # the header, and the size of the file (it may be truncated).
+        if len(mm) < _HEADER.size:
+            return False
+        magic,version,maxorder = _HEADER.unpack_from(mm,0)
+        if magic != MAGIC or version != VERSION or maxorder < self.maxorder or \
+           len(mm) < _HEADER.size+maxorder*_ENTRY.size:
+            return False
+        ntrees = []
+        for n in range(1,maxorder+1):
+            k,nt,offset = _ENTRY.unpack_from(mm,_HEADER.size+(n-1)*_ENTRY.size)
+            if k != n:
+                return False
+            ntrees.append(nt)
+        return len(mm) == _catalog_size(maxorder,ntrees)
+    def _load(self):
+        # map the catalog file, (re)generating it if needed.
+        if self._mm is not None:
+            return True
+        if self._failed or self.path == NO_FILE or sys.byteorder != "little":
+            return False
+        for attempt in range(0,2):
+            try:
+                with open(self.path,"rb") as f:
+                    mm = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+                if self._valid(mm):
+                    self._mm = mm
+                    return True
+                mm.close()
+            except (OSError,ValueError):
+                pass
+            if attempt == 0:
+                tables = [TreeTable(n) for n in range(1,self.maxorder+1)]
+                try:
+                    write_catalog(self.path,self.maxorder,tables)
+                except OSError:
+                    # keep the computed tables in memory:
+                    for T in tables:
+                        self.tables.setdefault(T.n,T)
+                    break
+        # no usable file: the trees will be computed in memory.
+        self._failed = True
+        return False
+    def _read(self,n):
+        mv = memoryview(self._mm)
+        _,ntrees,offset = _ENTRY.unpack_from(self._mm,
+                                             _HEADER.size+(n-1)*_ENTRY.size)
+        size = ntrees*n
+        levels = mv[offset:offset+size].cast("b")
+        parents = mv[offset+size:offset+2*size].cast("b")
+        o = offset+2*size
+        o+= (-(2*size))%8
+        gamma = mv[o:o+8*ntrees].cast("q")
+        sigma = mv[o+8*ntrees:o+16*ntrees].cast("q")
+        return TreeTable(n,levels,parents,gamma,sigma)
+    def table(self,n):
+        """
+        The TreeTable of the rooted trees with n nodes.
+        """
+        if n not in self.tables:
+            if n <= self.maxorder and self._load():
+                self.tables[n] = self._read(n)
+            else:
+                self.tables[n] = TreeTable(n)
+        return self.tables[n]
+#
+_default_catalog = None
+def default_catalog():
+    """
+    The catalog shared by all the RKTrees of the process.
+    """
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = TreeCatalog()
+    return _default_catalog
+def set_default_catalog(path=None,maxorder=None):
+    """
+    Replace the catalog shared by the RKTrees created from now on: its file
+    is 'path' (default: see default_catalog_path; NO_FILE: no file).
+    """
+    global _default_catalog
+    _default_catalog = TreeCatalog(path,maxorder)
+    return _default_catalog
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+r"""
+A compact rooted trees generator, which does not need sage.combinat.
+
+Rooted trees with n nodes are generated as canonical level sequences
+(Beyer and Hedetniemi, "Constant time generation of rooted trees",
+SIAM J. Comput. 9, 1980): the levels of the nodes (the root has level 0),
+in depth first order, the sons of each node being sorted so that the
+sequence is maximal. For each tree we also compute:
+
+- the parent array: parents[i] is the father of node i (-1 for the root),
+
+- gamma (the density) and sigma (the symmetry coefficient), see HW or HLW.
+
+All of them are stored in flat arrays (one TreeTable per number of nodes).
+"""
+from array import array
+from math import factorial
+#
+def level_sequences(n):
+    """
+    Generate the canonical level sequences of all the rooted trees with n
+    nodes (the same list is modified and yielded each time).
+
+    EXAMPLES::
+
+    sage: [list(L) for L in level_sequences(4)]
+    [[0, 1, 2, 3], [0, 1, 2, 2], [0, 1, 2, 1], [0, 1, 1, 1]]
+    """
+    L = list(range(0,n))
+    yield L
+    while True:
+        p = n-1
+        while p > 0 and L[p] <= 1:
+            p-= 1
+        if p == 0:
+            return
+        q = p-1
+        while L[q] != L[p]-1:
+            q-= 1
+        for i in range(p,n):
+            L[i] = L[i-p+q]
+        yield L
+def level_sequence_to_parents(L):
+    """
+    Return the parent array of the tree given by its level sequence L.
+    """
+    parents = [-1 for i in range(0,len(L))]
+    last = [0 for i in range(0,len(L))] # last node seen at each level.
+    for i in range(1,len(L)):
+        parents[i] = last[L[i]-1]
+        last[L[i]] = i
+    return parents
+def _subtree_ends(L):
+    # end[i]: the subtree of node i is L[i:end[i]].
+    n = len(L)
+    end = [n for i in range(0,n)]
+    stack = []
+    for i in range(0,n):
+        while stack and L[stack[-1]] >= L[i]:
+            end[stack.pop()] = i
+        stack.append(i)
+    return end
+def gamma_and_sigma(L,parents):
+    r"""
+    Return \gamma(t) and \sigma(t) for the tree t given by its level sequence
+    L and its parent array.
+    """
+    n = len(L)
+    end = _subtree_ends(L)
+    gamma = 1
+    for i in range(0,n):
+        gamma*= end[i]-i
+    sigma = 1
+    for i in range(0,n):
+        # sons of i are sorted: equal subtrees are consecutive.
+        f = 1
+        prev = None
+        j = i+1
+        while j < end[i]:
+            st = L[j:end[j]]
+            if st == prev:
+                f+= 1
+            else:
+                sigma*= factorial(f)
+                f = 1
+            prev = st
+            j = end[j]
+        sigma*= factorial(f)
+    return gamma,sigma
+#
+class TreeTable(object):
+    r"""
+    All the rooted trees with n nodes, stored in flat arrays.
+
+    EXAMPLES::
+
+    sage: T = TreeTable(5)
+    sage: T.ntrees
+    9
+    sage: T.parents_of(3), T.gamma[3], T.sigma[3]
+    """
+    def __init__(self,n,levels=None,parents=None,gamma=None,sigma=None):
+        self.n = n
+        if levels is None:
+            levels = array('b')
+            parents = array('b')
+            gamma = array('q')
+            sigma = array('q')
+            for L in level_sequences(n):
+                P = level_sequence_to_parents(L)
+                g,s = gamma_and_sigma(L,P)
+                levels.extend(L)
+                parents.extend(P)
+                gamma.append(g)
+                sigma.append(s)
+        self.levels = levels
+        self.parents = parents
+        self.gamma = gamma
+        self.sigma = sigma
+        self.ntrees = len(gamma)
+    def __len__(self):
+        return self.ntrees
+    def levels_of(self,k):
+        """
+        Level sequence of tree k.
+        """
+        return tuple(self.levels[k*self.n:(k+1)*self.n])
+    def parents_of(self,k):
+        """
+        Parent array of tree k.
+        """
+        return list(self.parents[k*self.n:(k+1)*self.n])
+    def formula(self,k):
+        """
+        The list of the (father,son) pairs of tree k, nodes being numbered
+        from 1 (as in RKTrees.tree_to_order_formula).
+        """
+        P = self.parents_of(k)
+        if self.n == 1:
+            return [(1,1)]
+        return [(P[i]+1,i+1) for i in range(1,self.n)]
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from  sage.all import *
-from sage.combinat.rooted_tree import RootedTree as RT
-from sage.combinat.rooted_tree import RootedTrees_size as RTS
+from .RKWeights import ElementaryWeights
+from .RKTreeCatalog import default_catalog
 #
 class  RKTrees(SageObject):
     r"""
@@ -14,11 +14,19 @@ class  RKTrees(SageObject):
     n is the maximum depth of the rooted trees you will use (the
     built dictionary will be enlarged if necessary (lazzy evaluation)).
 
+    dtrees[i] is the TreeTable of the rooted trees with i nodes (level
+    sequences, parent arrays, gamma and sigma, see RKTreeTables); they are
+    read from a catalog (see RKTreeCatalog), by default the one shared by
+    all the RKTrees of the process.
+
     Bibliography: HW are the books of Hairer, Wanner and co-workers.
     """
-    def __init__(self):
+    def __init__(self,cache_size=10000,catalog=None):
         self.n = 1
         self.dtrees = {}
+        self.W = None
+        self.cache_size = cache_size
+        self.catalog = catalog if catalog is not None else default_catalog()
         self.expand(1)
     def expand(self,l):
         r"""
@@ -26,7 +34,7 @@ class  RKTrees(SageObject):
         """
         for i in range(1,l+1):
             if not i in self.dtrees:
-                self.dtrees[i] = RTS(i).list()
+                self.dtrees[i] = self.catalog.table(i)
         self.n=l
     def gamma(self,t):
         r"""
@@ -50,17 +58,35 @@ class  RKTrees(SageObject):
         faclist = []
         self._LabelledTree_to_formula(rtc,rtc.label(),faclist)
         return faclist
+    def tree_to_parents(self,rt):
+        """
+        Return the parent array of the tree rt (see RKWeights), deduced
+        from the formula of its canonical labelling.
+        """
+        parents = [-1 for i in range(0,rt.node_number())]
+        for f,s in self.tree_to_order_formula(rt):
+            if f != s:
+                parents[s-1] = f-1
+        return parents
     def eval_sum_prod(self,A,B,formula,v):
         return  B[v[0]] * prod( [A[v[i[0]-1],v[i[1]-1]] for i in formula] )
+    def weights(self,A,B):
+        """
+        Return the elementary weights engine for (A,B); its cache of stage
+        vectors is kept as long as we work with the same A (stage vectors
+        do not depend on B: embedded weights share them).
+        """
+        if self.W is None or self.W.A is not A:
+            self.W = ElementaryWeights(A,B,self.cache_size)
+        elif self.W.B is not B:
+            self.W.B = B
+        return self.W
     def tree_order_form(self,A,B,rt):
-        n = len(B)
-        s = set(range(0,n))
-        S = cartesian_product([s for i in range(0,rt.node_number())])
-        #
-        f = self.tree_to_order_formula(rt)
-        #
-        s =  sum([self.eval_sum_prod(A,B,f,v) for v in S])
-        return s*self.gamma(rt) 
+        r"""
+        Return \gamma(rt)*\Phi(rt), which must be 1 for the order
+        condition associated to rt to be fulfilled.
+        """
+        return self.weights(A,B).weight(self.tree_to_parents(rt))*self.gamma(rt)
     def check_tree_order(self,A,B,rt):
         return self.tree_order_form(A,B,rt) == 1
     def check_order(self,A,B,order):
@@ -73,19 +99,78 @@ class  RKTrees(SageObject):
         """
         if order == 1:
             s = sum(B)
-            s.exactify()#should make sometime more readable results, may be.
+            if hasattr(s,"exactify"):
+                s.exactify()#should make sometime more readable results, may be.
             return s == 1
         else:
             for i in range(len(self.dtrees)+1,order+1):
                 self.expand(i)
-            for t in self.dtrees[order]:
-                tc = t.canonical_labelling()
-                ok = self.check_tree_order(A,B,tc)
-                if not ok:
+            W = self.weights(A,B)
+            T = self.dtrees[order]
+            for k in range(0,T.ntrees):
+                if W.weight(T.parents_of(k))*T.gamma[k] != 1:
                     return False
             return True
+    def make_order_equations(self,A,B,order):
+        """
+        Return the list of the order conditions of order 'order', as
+        the expressions gamma(t)*Phi(t)-1 which must vanish.
+        """
+        if order == 1:
+            return [sum(B)-1]
+        else:
+            for i in range(len(self.dtrees)+1,order+1):
+                self.expand(i)
+            W = self.weights(A,B)
+            T = self.dtrees[order]
+            return [W.weight(T.parents_of(k))*T.gamma[k]-1
+                    for k in range(0,T.ntrees)]
+ 
+    def order_conditions(self,A,B,order,ring=None,lazy=True,
+                         with_trees=False,cache_size=None):
+        r"""
+        The order conditions gamma(t)*Phi(t)-1 of all the rooted trees t with
+        at most 'order' nodes, as elements of 'ring' (default: the ring of
+        the coefficients of A and B).
+
+        For a tableau with free parameters, take A and B over a multivariate
+        polynomial ring (sparse polynomials): each condition is computed
+        directly as a polynomial, with the stage vectors (see RKWeights),
+        which are shared by all the trees with common subtrees.
+
+        lazy: if True, the conditions are generated one tree after the
+        other (the cache of stage vectors is bounded by cache_size, default:
+        self.cache_size), otherwise a list is returned.
+
+        with_trees: give pairs (level sequence of t, condition).
+
+        EXAMPLES::
+
+        sage: R = PolynomialRing(QQ,['a21','a31','a32','b1','b2','b3'])
+        sage: a21,a31,a32,b1,b2,b3 = R.gens()
+        sage: A = matrix(R,[[0,0,0],[a21,0,0],[a31,a32,0]])
+        sage: B = vector(R,[b1,b2,b3])
+        sage: I = R.ideal(list(RKTrees().order_conditions(A,B,3)))
+        """
+        if ring is not None:
+            A = matrix(ring,A)
+            B = vector(ring,B)
+        gen = self._order_conditions(A,B,order,with_trees,
+                                     cache_size if cache_size is not None
+                                     else self.cache_size)
+        return gen if lazy else list(gen)
+    def _order_conditions(self,A,B,order,with_trees,cache_size):
+        for i in range(len(self.dtrees)+1,order+1):
+            self.expand(i)
+        W = ElementaryWeights(A,B,cache_size)
+        for n in range(1,order+1):
+            T = self.dtrees[n]
+            for k in range(0,T.ntrees):
+                c = W.weight(T.parents_of(k))*T.gamma[k]-1
+                yield (T.levels_of(k),c) if with_trees else c
  
     def symetry_coefficient(self,rt):
+        from sage.combinat.rooted_tree import RootedTree as RT
         rt1 = RT(rt)
         if rt1 ==  RT([]):
             return 1
@@ -108,5 +193,6 @@ class  RKTrees(SageObject):
         """
         self.gamma={}
         for i in range(1,self.n+1):
-            for s in self.dtrees[i]:
-                self.gamma[s] = self.symetry_coefficient(s)
+            T = self.dtrees[i]
+            for k in range(0,T.ntrees):
+                self.gamma[T.levels_of(k)] = T.sigma[k]
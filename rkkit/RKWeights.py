@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+r"""
+Elementary weights of rooted trees, computed with stage vectors.
+
+For a tree t with sons t_1, ... ,t_m, the stage vector of t is
+
+    g(t) = (A g(t_1)) * ... * (A g(t_m))     (element-wise products),
+
+with g(leaf) = (1, ... ,1), and the elementary weight is \Phi(t) = B.g(t).
+This is the sum over all index tuples of HW (TI, page 148), but
+computed with O(n s^2) operations for a tree with n nodes, instead of O(s^n).
+
+The stage vectors only depend on the (unlabelled) subtrees: they are cached,
+keyed by a canonical form of the subtree, so that all the trees of a given
+order, and of all the lower orders, share their common subtrees.
+"""
+from sage.all import *
+from collections import OrderedDict
+#
+class ElementaryWeights(SageObject):
+    r"""
+    Elementary weights engine for a given Butcher array (A,B).
+
+    Trees are given by their parent arrays: parents[i] is the index of the
+    father of node i, and the root is the (only) node with parents[i] == -1.
+
+    At most 'maxsize' subtrees are cached (least recently used ones are
+    evicted first); maxsize=None means no limit.
+
+    EXAMPLES::
+
+    sage: W = ElementaryWeights(A,B)
+    sage: W.weight([-1,0,0])  # the tree [[],[]], ie: sum(b_i c_i^2).
+    sage: W.hits, W.misses
+    """
+    def __init__(self,A,B,maxsize=10000):
+        self.A = A
+        self.B = B
+        self.s = len(B)
+        self.One = vector(A.base_ring(),[1 for i in range(0,self.s)])
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def sons(self,parents):
+        """
+        Return the root and the list of the sons of each node.
+        """
+        sons = [[] for i in range(0,len(parents))]
+        root = None
+        for i in range(0,len(parents)):
+            if parents[i] < 0:
+                root = i
+            else:
+                sons[parents[i]].append(i)
+        return root,sons
+    def tree_key(self,parents):
+        """
+        Canonical form of the tree given by 'parents': the sorted tuple of
+        the canonical forms of the sons of the root (a leaf is ()).
+        """
+        root,sons = self.sons(parents)
+        # nodes, fathers before sons:
+        nodes = [root]
+        k = 0
+        while k < len(nodes):
+            nodes.extend(sons[nodes[k]])
+            k+= 1
+        keys = [None for i in range(0,len(parents))]
+        for i in reversed(nodes):
+            keys[i] = tuple(sorted([keys[j] for j in sons[i]]))
+        return keys[root]
+    def _entry(self,key):
+        # [g(t), A*g(t)] for the tree of canonical form 'key'.
+        if key in self.cache:
+            self.hits+= 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses+= 1
+        v = self.One
+        for k in key:
+            v = v.pairwise_product(self.stage_vector_times_A(k))
+        entry = [v,None]
+        self.cache[key] = entry
+        if self.maxsize is not None and len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return entry
+    def stage_vector(self,key):
+        """
+        Stage vector g(t) of the tree of canonical form 'key'.
+        """
+        return self._entry(key)[0]
+    def stage_vector_times_A(self,key):
+        """
+        A*g(t) for the tree of canonical form 'key'.
+        """
+        entry = self._entry(key)
+        if entry[1] is None:
+            entry[1] = self.A*entry[0]
+        return entry[1]
+    def weight_of_key(self,key):
+        r"""
+        The elementary weight \Phi(t) of the tree of canonical form 'key'.
+        """
+        return self.B.dot_product(self.stage_vector(key))
+    def weight(self,parents):
+        r"""
+        The elementary weight \Phi(t) of the tree t given by 'parents'.
+        """
+        return self.weight_of_key(self.tree_key(parents))
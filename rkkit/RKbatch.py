@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+r"""
+Batch analysis of catalogs of Runge-Kutta methods.
+
+Each method is analysed (see RKformula) in its own worker process; at most
+'processes' workers run at the same time, a worker which runs longer than
+'timeout' seconds is killed, and results are returned as soon as they are
+available.
+
+EXAMPLES::
+
+sage: from methods.formulas import *
+sage: for r in analyse([RK4,Radau5,SDIRK5],["order","is_A_stable"]):
+....:     print(r)
+
+From the command line (results are written as JSON lines)::
+
+    sage -python -m rkkit.RKbatch methods.formulas my_tableau.json \
+          --processes 8 --timeout 600 --properties order,is_A_stable
+
+A tableau file is a JSON file like::
+
+    {"title": "Heun", "A": [["0","0"],["1","0"]], "B": ["1/2","1/2"]}
+
+where the coefficients are strings, evaluated exactly by Sage (for example
+"1/4+sqrt(3)/6"); "C" and "Bhat" (embedded weights) are optional. Files may
+come from anywhere: the coefficients are parsed as arithmetic expressions
+of numbers and sqrt, nothing else (they are never evaluated as Python).
+"""
+from sage.all import *
+from sage.misc.parser import Parser
+from .RKRungeKutta import RungeKutta
+from .RKformula import RKformula
+from .RKStore import PropertyStore
+import os
+import sys
+import re
+import json
+import time
+import inspect
+import argparse
+import importlib
+import multiprocessing
+from multiprocessing.connection import wait
+#
+# coefficients of the tableau files: numbers, + - * / ^, and sqrt (any
+# other name raises NameError).
+_coefficient_parser = Parser(make_int=ZZ,make_float=RR,make_var={},
+                             make_function={"sqrt": lambda x: AA(x).sqrt()})
+def tableau_from_file(path):
+    """
+    Return a RungeKutta class built from a tableau file (see above).
+    """
+    with open(path) as f:
+        d = json.load(f)
+    ev = lambda e: AA(_coefficient_parser.parse(str(e)))
+    A = matrix(AA,[[ev(a) for a in row] for row in d["A"]])
+    B = vector(AA,[ev(b) for b in d["B"]])
+    C = [ev(c) for c in d.get("C",[])]
+    Bhat = vector(AA,[ev(b) for b in d["Bhat"]]) if "Bhat" in d else None
+    title = d.get("title",os.path.basename(path))
+    def constructor(self):
+        RungeKutta.__init__(self,A,B,title,C,Bhat=Bhat)
+    # the class is named after the title (as an identifier):
+    name = re.sub(r"\W+","_",title).strip("_") or "Tableau"
+    if name[0].isdigit():
+        name = "_"+name
+    return type(name,(RungeKutta,),{"__init__": constructor})
+def methods_of_module(module):
+    """
+    All the RungeKutta subclasses defined in a module.
+    """
+    return [c for n,c in inspect.getmembers(module,inspect.isclass)
+            if issubclass(c,RungeKutta) and c is not RungeKutta and
+            c.__module__ == module.__name__]
+def load_methods(specs):
+    """
+    Return the list of RungeKutta classes described by specs, a list of:
+    RungeKutta subclasses or instances, tableau files (".json"), modules
+    or module names ("methods.formulas": all the RungeKutta subclasses of the
+    module), or "module:Class".
+    """
+    L = []
+    for spec in specs:
+        if inspect.isclass(spec) or isinstance(spec,RungeKutta):
+            L.append(spec)
+        elif inspect.ismodule(spec):
+            L+= methods_of_module(spec)
+        elif spec.endswith(".json"):
+            L.append(tableau_from_file(spec))
+        elif ":" in spec:
+            m,c = spec.split(":")
+            L.append(getattr(importlib.import_module(m),c))
+        else:
+            L+= methods_of_module(importlib.import_module(spec))
+    return L
+def to_json(x):
+    """
+    Convert a property to something JSON can write (exact values which are
+    not booleans or integers are written as strings).
+    """
+    if isinstance(x,bool) or x is None:
+        return x
+    if isinstance(x,(list,tuple)):
+        return [to_json(y) for y in x]
+    if isinstance(x,(int,Integer)):
+        return int(x)
+    return str(x)
+def analyse_method(method,properties=None,store=None,reduce=False):
+    """
+    Compute the properties of one method (a RungeKutta class or instance).
+    Return a dictionary (written with to_json).
+
+    reduce: analyse the equivalent irreducible method (see RKreduce); its
+    number of stages and the map of the stages are added to the result.
+    """
+    t = time.time()
+    RK = method() if inspect.isclass(method) else method
+    res = {"method": type(RK).__name__,"title": RK.Title,
+           "stages": len(RK.B),"properties": {},"errors": {}}
+    F = RKformula(RK,store=store,reduce=reduce)
+    if reduce:
+        res["reduced_stages"] = F.s
+        res["stage_map"] = F.stage_map
+    for p in (properties if properties is not None else F.all_properties):
+        try:
+            res["properties"][p] = to_json(getattr(F,p)())
+        except Exception as e:
+            res["errors"][p] = type(e).__name__+": "+str(e)
+    res["time"] = time.time()-t
+    return res
+def rank_by_error(methods,norm=0,store=None):
+    """
+    Rank methods (see load_methods) by accuracy per stage: by the effective
+    error constant s A^(1/p), where s is the number of stages, p the order
+    and A the principal error norm (norm=0: 2-norm, norm=1: max-norm; see
+    RKformula.principal_error_norm). This is the number of function
+    evaluations needed to bring the local error under a given tolerance,
+    up to a factor which is the same for all methods of the same order.
+
+    Return the list of dictionaries (method, title, stages, order, error,
+    effective) sorted by order (highest first), then effective error.
+
+    EXAMPLES::
+
+    sage: from methods.formulas import *
+    sage: for r in rank_by_error([RK4,DormandPrince,Fehlberg]):
+    ....:     print(r)
+    """
+    L = []
+    for method in load_methods(methods):
+        RK = method() if inspect.isclass(method) else method
+        F = RKformula(RK,store=store)
+        p = F.order()
+        e = F.principal_error_norm()[norm]
+        s = len(RK.B)
+        L.append({"method": type(RK).__name__,"title": RK.Title,
+                  "stages": s,"order": int(p),"error": float(e),
+                  "effective": float(s*RDF(e)**(1./p)) if p > 0 else
+                  float("inf")})
+    return sorted(L,key=lambda r: (-r["order"],r["effective"]))
+def _worker(conn,method,properties,store_path,reduce):
+    store = PropertyStore(store_path) if store_path is not None else None
+    try:
+        r = analyse_method(method,properties,store,reduce)
+    except Exception as e:
+        r = {"method": getattr(method,"__name__",str(method)),
+             "error": type(e).__name__+": "+str(e)}
+    conn.send(json.dumps(r))
+    conn.close()
+def analyse(methods,properties=None,processes=None,timeout=None,
+            store_path=None,reduce=False):
+    """
+    Analyse a list of methods (see load_methods), in parallel; generate the
+    results (dictionaries) as soon as they are available.
+
+    processes: maximum number of worker processes (default: number of cores).
+
+    timeout: maximum time (in seconds) for one method; the worker is then
+    killed, and the result has an "error" field.
+
+    store_path: path of a PropertyStore (see RKStore) shared by the workers.
+
+    reduce: analyse the equivalent irreducible methods (see analyse_method).
+    """
+    methods = load_methods(methods)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    # fork: workers inherit Sage, and methods built on the fly (colloc).
+    ctx = multiprocessing.get_context("fork")
+    todo = list(enumerate(methods))
+    running = {} # reader -> (index, method, process, start time)
+    while todo or running:
+        while todo and len(running) < processes:
+            i,m = todo.pop(0)
+            r,w = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=_worker,args=(w,m,properties,store_path,
+                                                 reduce))
+            p.start()
+            w.close()
+            running[r] = (i,m,p,time.time())
+        if timeout is not None:
+            now = time.time()
+            delay = max(0,min(st+timeout-now for i,m,p,st in running.values()))
+        else:
+            delay = None
+        for r in wait(list(running),delay):
+            i,m,p,st = running.pop(r)
+            try:
+                res = json.loads(r.recv())
+            except EOFError:
+                res = {"method": getattr(m,"__name__",str(m)),
+                       "error": "worker died (exit code "+
+                       str(p.exitcode)+")"}
+            p.join()
+            res["index"] = i
+            yield res
+        if timeout is not None:
+            now = time.time()
+            for r in [r for r in running if running[r][3]+timeout <= now]:
+                i,m,p,st = running.pop(r)
+                p.terminate()
+                p.join()
+                yield {"index": i,"method": getattr(m,"__name__",str(m)),
+                       "error": "timeout ("+str(timeout)+"s)"}
+def main(argv=None):
+    """
+    Command line entry point: analyse methods, write JSON lines.
+    """
+    parser = argparse.ArgumentParser(prog="rkkit.RKbatch",
+        description="Compute properties of Runge-Kutta methods in parallel.")
+    parser.add_argument("methods",nargs="+",
+        help="modules, module:Class, or tableau files (.json)")
+    parser.add_argument("-p","--processes",type=int,default=None)
+    parser.add_argument("-t","--timeout",type=float,default=None,
+        help="timeout for each method, in seconds")
+    parser.add_argument("--properties",default=None,
+        help="comma separated list of properties (default: all)")
+    parser.add_argument("--store",default=None,
+        help="path of a property store (see RKStore)")
+    parser.add_argument("--reduce",action="store_true",
+        help="analyse the equivalent irreducible methods")
+    parser.add_argument("-o","--output",default=None,
+        help="output file (default: standard output)")
+    args = parser.parse_args(argv)
+    properties = args.properties.split(",") if args.properties else None
+    out = open(args.output,"w") if args.output else sys.stdout
+    try:
+        for r in analyse(args.methods,properties,args.processes,
+                         args.timeout,args.store,args.reduce):
+            out.write(json.dumps(r)+"\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+if __name__ == "__main__":
+    main()
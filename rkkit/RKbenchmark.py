@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+r"""
+Work-precision benchmarks of Runge-Kutta methods.
+
+Each method (see RKbatch.load_methods) is run by RKintegrator on a set of
+test problems with reference solutions; for each run we record the wall
+time, the numbers of calls to f, of Jacobians and of LU factorizations, the
+numbers of accepted and rejected steps, and the error at the final time.
+The time of the exact analysis of the methods can be recorded too
+(analysis_times), as a baseline for the speed of rkkit.
+
+Methods with embedded weights (Bhat) are run with an adaptive step size, for
+a list of tolerances; the other ones with fixed steps, for a list of numbers
+of steps. Explicit methods are not run on stiff problems (unless asked).
+
+Standard problems (see HW I and HW II, and the test set of Hairer and
+Wanner): Robertson, Van der Pol, HIRES (stiff), Kepler, Lorenz (non stiff).
+
+EXAMPLES::
+
+sage: from methods.formulas import *
+sage: R = list(benchmark([RK4,DormandPrince,Radau5],[kepler(),hires()]))
+sage: work_precision_plot(R,"Kepler")
+
+From the command line (results are written as JSON lines)::
+
+    sage -python -m rkkit.RKbenchmark methods.formulas --problems kepler,hires \
+          -o bench.json
+"""
+from sage.all import *
+from .RKbatch import load_methods, analyse_method
+from .RKintegrate import RKintegrator
+import sys
+import json
+import time
+import inspect
+import argparse
+import numpy
+import scipy.integrate
+#
+def _matrix(rows):
+    # a matrix (or a stack of matrices, for ensembles) from rows of arrays
+    # and numbers.
+    n = len(rows[0])
+    a = numpy.broadcast_arrays(*[x for r in rows for x in r])
+    return numpy.stack([numpy.stack(a[i*n:(i+1)*n],axis=-1)
+                        for i in range(0,len(rows))],axis=-2)
+#
+class Problem(SageObject):
+    r"""
+    A test problem y' = f(t,y), y(t_span[0]) = y0, with the solution at
+    t_span[1] (reference).
+
+    f and jac (its Jacobian) are vectorized (see RKintegrate).
+
+    If the reference is not given, it is computed once, with scipy, with a
+    tight tolerance (reference_method, reference_rtol).
+
+    The error of a solution y is max_i |y_i - ref_i| / max(|ref_i|, floor).
+    """
+    def __init__(self,name,f,y0,t_span,jac=None,reference=None,stiff=False,
+                 floor=1.e-6,reference_method="DOP853",reference_rtol=1.e-13):
+        self.name = name
+        self.f = f
+        self.jac = jac
+        self.y0 = numpy.array(y0,dtype=float)
+        self.t_span = t_span
+        self.stiff = stiff
+        self.floor = floor
+        self.reference_method = reference_method
+        self.reference_rtol = reference_rtol
+        self._reference = numpy.array(reference,dtype=float) \
+            if reference is not None else None
+    def __repr__(self):
+        return "Problem "+self.name+(" (stiff)" if self.stiff else "")
+    def reference(self):
+        """
+        The solution at t_span[1].
+        """
+        if self._reference is None:
+            kw = {"jac": self.jac} if self.reference_method in \
+                ["Radau","BDF","LSODA"] else {}
+            r = scipy.integrate.solve_ivp(self.f,self.t_span,self.y0,
+                                          method=self.reference_method,
+                                          rtol=self.reference_rtol,
+                                          atol=self.reference_rtol*self.floor,
+                                          **kw)
+            if not r.success:
+                raise RuntimeError("reference of "+self.name+": "+r.message)
+            self._reference = r.y[:,-1]
+        return self._reference
+    def error(self,y):
+        """
+        Relative error of y (solution at t_span[1]).
+        """
+        ref = self.reference()
+        return float(numpy.max(numpy.abs(y-ref)/
+                               numpy.maximum(numpy.abs(ref),self.floor)))
+#
+def robertson(t_end=40.):
+    """
+    Robertson's chemical reaction (HW II, section IV.1); stiff.
+    """
+    def f(t,y):
+        a,b,c = y[...,0],y[...,1],y[...,2]
+        return numpy.stack([-0.04*a+1.e4*b*c,
+                            0.04*a-1.e4*b*c-3.e7*b*b,
+                            3.e7*b*b],axis=-1)
+    def jac(t,y):
+        a,b,c = y[...,0],y[...,1],y[...,2]
+        return _matrix([[-0.04,1.e4*c,1.e4*b],
+                        [0.04,-1.e4*c-6.e7*b,-1.e4*b],
+                        [0.,6.e7*b,0.]])
+    return Problem("Robertson",f,[1.,0.,0.],(0.,t_end),jac,stiff=True,
+                   floor=1.e-12,reference_method="Radau")
+def van_der_pol(eps=1.e-3,t_end=2.):
+    """
+    Van der Pol's equation, y1'' = ((1-y1^2) y1' - y1)/eps (HW II, section
+    IV.1); stiff for small eps.
+    """
+    def f(t,y):
+        a,b = y[...,0],y[...,1]
+        return numpy.stack([b,((1-a*a)*b-a)/eps],axis=-1)
+    def jac(t,y):
+        a,b = y[...,0],y[...,1]
+        return _matrix([[0.,1.],[(-2*a*b-1)/eps,(1-a*a)/eps]])
+    return Problem("Van der Pol",f,[2.,-0.66],(0.,t_end),jac,stiff=True,
+                   reference_method="Radau")
+def hires():
+    """
+    HIRES: 8 chemical reactions of the growth of plants (HW II, section
+    IV.10); stiff. The reference is the one of the test set of Hairer and
+    Wanner.
+    """
+    def f(t,y):
+        y1,y2,y3,y4,y5,y6,y7,y8 = [y[...,i] for i in range(0,8)]
+        r = 280.*y6*y8
+        return numpy.stack([-1.71*y1+0.43*y2+8.32*y3+0.0007,
+                            1.71*y1-8.75*y2,
+                            -10.03*y3+0.43*y4+0.035*y5,
+                            8.32*y2+1.71*y3-1.12*y4,
+                            -1.745*y5+0.43*y6+0.43*y7,
+                            -r+0.69*y4+1.71*y5-0.43*y6+0.69*y7,
+                            r-1.81*y7,
+                            -r+1.81*y7],axis=-1)
+    def jac(t,y):
+        y6,y8 = y[...,5],y[...,7]
+        z = 0.
+        return _matrix([[-1.71,0.43,8.32,z,z,z,z,z],
+                        [1.71,-8.75,z,z,z,z,z,z],
+                        [z,z,-10.03,0.43,0.035,z,z,z],
+                        [z,8.32,1.71,-1.12,z,z,z,z],
+                        [z,z,z,z,-1.745,0.43,0.43,z],
+                        [z,z,z,0.69,1.71,-0.43-280.*y8,0.69,-280.*y6],
+                        [z,z,z,z,z,280.*y8,-1.81,280.*y6],
+                        [z,z,z,z,z,-280.*y8,1.81,-280.*y6]])
+    ref = [0.7371312573325668e-3,0.1442485726316185e-3,
+           0.5888729740967575e-4,0.1175651343283149e-2,
+           0.2386356198831331e-2,0.6238968252742796e-2,
+           0.2849998395185769e-2,0.2850001604814231e-2]
+    return Problem("HIRES",f,[1.,0.,0.,0.,0.,0.,0.,0.0057],(0.,321.8122),
+                   jac,reference=ref,stiff=True,floor=1.e-4)
+def kepler(e=0.5,periods=3):
+    """
+    The two body problem (HW I, section II.10), with eccentricity e; the
+    solution is periodic (period 2 pi): the reference is y0.
+    """
+    def f(t,y):
+        q1,q2 = y[...,0],y[...,1]
+        r3 = (q1*q1+q2*q2)**1.5
+        return numpy.stack([y[...,2],y[...,3],-q1/r3,-q2/r3],axis=-1)
+    def jac(t,y):
+        q1,q2 = y[...,0],y[...,1]
+        r2 = q1*q1+q2*q2
+        r5 = r2**2.5
+        a = (3*q1*q1-r2)/r5
+        b = 3*q1*q2/r5
+        c = (3*q2*q2-r2)/r5
+        return _matrix([[0.,0.,1.,0.],[0.,0.,0.,1.],
+                        [a,b,0.,0.],[b,c,0.,0.]])
+    y0 = [1-e,0.,0.,numpy.sqrt((1+e)/(1-e))]
+    return Problem("Kepler",f,y0,(0.,2*numpy.pi*periods),jac,reference=y0,
+                   floor=1.)
+def lorenz(t_end=2.,sigma=10.,rho=28.,beta=8./3):
+    """
+    The Lorenz attractor (HW I, section I.16); chaotic, so that the interval
+    is short.
+    """
+    def f(t,y):
+        a,b,c = y[...,0],y[...,1],y[...,2]
+        return numpy.stack([sigma*(b-a),a*(rho-c)-b,a*b-beta*c],axis=-1)
+    def jac(t,y):
+        a,b,c = y[...,0],y[...,1],y[...,2]
+        return _matrix([[-sigma,sigma,0.],[rho-c,-1.,-a],[b,a,-beta]])
+    return Problem("Lorenz",f,[-8.,8.,27.],(0.,t_end),jac)
+def standard_problems():
+    """
+    The list of the standard test problems.
+    """
+    return [robertson(),van_der_pol(),hires(),kepler(),lorenz()]
+#
+def run(I,P,tol=None,nsteps=None,max_steps=100000):
+    """
+    Run the integrator I (a RKintegrator) on the problem P: with an adaptive
+    step size (rtol = tol, atol = tol*P.floor), or with nsteps fixed steps.
+    Return a dictionary: wall time, counters, and error.
+    """
+    I.reset_counters()
+    res = {"problem": P.name,"tol": tol,"nsteps": nsteps}
+    t = time.perf_counter()
+    try:
+        if tol is not None:
+            T,Y = I.integrate_adaptive(P.f,P.y0,P.t_span,rtol=tol,
+                                       atol=tol*P.floor,jac=P.jac,
+                                       max_steps=max_steps)
+            y = Y[-1]
+        else:
+            t1,y = I.integrate(P.f,P.y0,P.t_span,nsteps,save=False,
+                               jac=P.jac)
+        res["time"] = time.perf_counter()-t
+        err = P.error(y)
+        res["error"] = err if numpy.isfinite(err) else None
+    except Exception as e:
+        res["time"] = time.perf_counter()-t
+        res["failure"] = type(e).__name__+": "+str(e)
+    for c in ["nfev","njev","nlu","naccept","nreject"]:
+        res[c] = getattr(I,c)
+    return res
+def benchmark(methods,problems=None,tolerances=None,nsteps=None,
+              explicit_on_stiff=False,max_steps=100000):
+    """
+    Run the methods (see RKbatch.load_methods) on the problems (default:
+    standard_problems()); generate the results (dictionaries, see run) with
+    the "method" and "title" fields added.
+
+    tolerances: the rtol of the adaptive runs (default: 10^-3 ... 10^-10).
+
+    nsteps: the numbers of steps of the fixed step runs (default: 25*2^k,
+    k = 0 ... 8). With fixed steps, the Newton iterations of implicit methods
+    may fail on stiff problems (in the initial transients): the run is then
+    recorded with a "failure" field.
+    """
+    if problems is None:
+        problems = standard_problems()
+    if tolerances is None:
+        tolerances = [10.**(-k) for k in range(3,11)]
+    if nsteps is None:
+        nsteps = [25*2**k for k in range(0,9)]
+    for m in load_methods(methods):
+        RK = m() if inspect.isclass(m) else m
+        name = type(RK).__name__
+        try:
+            I = RKintegrator(RK)
+        except Exception as e:
+            yield {"method": name,"title": RK.Title,
+                   "failure": type(e).__name__+": "+str(e)}
+            continue
+        for P in problems:
+            if P.stiff and I.explicit and not explicit_on_stiff:
+                continue
+            if I.Bhat is not None:
+                runs = [{"tol": tol} for tol in tolerances]
+            else:
+                runs = [{"nsteps": n} for n in nsteps]
+            for r in runs:
+                res = run(I,P,max_steps=max_steps,**r)
+                res["method"] = name
+                res["title"] = RK.Title
+                yield res
+def analysis_times(methods,properties=["order","is_A_stable"]):
+    """
+    The time of the exact analysis of each method (see
+    RKbatch.analyse_method): a baseline for the speed of rkkit itself.
+    """
+    for m in load_methods(methods):
+        r = analyse_method(m,properties)
+        yield {"method": r["method"],"title": r["title"],
+               "analysis": properties,"time": r["time"],
+               "errors": r["errors"]}
+def read_results(path):
+    """
+    Read the results written (as JSON lines) by main().
+    """
+    with open(path) as f:
+        return [json.loads(l) for l in f if l.strip()]
+def work_precision_plot(results,problem,cost="time"):
+    """
+    Plot, for one problem (its name), the cost ("time", "nfev", "nlu"...)
+    versus the error, for each method, in log-log scale.
+    """
+    G = Graphics()
+    methods = []
+    for r in results:
+        if r.get("problem") == problem and r["method"] not in methods:
+            methods.append(r["method"])
+    colors = rainbow(max(len(methods),1))
+    for k,m in enumerate(methods):
+        pts = sorted([(r["error"],max(r[cost],1.e-12)) for r in results
+                      if r.get("problem") == problem and r["method"] == m
+                      and r.get("error") is not None and r["error"] > 0])
+        if pts:
+            G+= line(pts,scale="loglog",color=colors[k],legend_label=m,
+                     marker="o")
+    G.axes_labels(["error",cost])
+    G.set_legend_options(loc="upper right")
+    return G
+def main(argv=None):
+    """
+    Command line entry point: run the benchmark, write JSON lines.
+    """
+    problems = {"robertson": robertson,"vanderpol": van_der_pol,
+                "hires": hires,"kepler": kepler,"lorenz": lorenz}
+    parser = argparse.ArgumentParser(prog="rkkit.RKbenchmark",
+        description="Work-precision benchmarks of Runge-Kutta methods.")
+    parser.add_argument("methods",nargs="+",
+        help="modules, module:Class, or tableau files (.json)")
+    parser.add_argument("--problems",default=None,
+        help="comma separated list among: "+",".join(problems))
+    parser.add_argument("--tolerances",default=None,
+        help="comma separated list of rtol (adaptive runs)")
+    parser.add_argument("--nsteps",default=None,
+        help="comma separated list of numbers of steps (fixed step runs)")
+    parser.add_argument("--explicit-on-stiff",action="store_true")
+    parser.add_argument("--analysis",action="store_true",
+        help="also time the exact analysis (order, A-stability)")
+    parser.add_argument("-o","--output",default=None,
+        help="output file (default: standard output)")
+    args = parser.parse_args(argv)
+    P = [problems[p]() for p in args.problems.split(",")] \
+        if args.problems else None
+    tol = [float(x) for x in args.tolerances.split(",")] \
+        if args.tolerances else None
+    ns = [int(x) for x in args.nsteps.split(",")] if args.nsteps else None
+    out = open(args.output,"w") if args.output else sys.stdout
+    try:
+        if args.analysis:
+            for r in analysis_times(args.methods):
+                out.write(json.dumps(r)+"\n")
+                out.flush()
+        for r in benchmark(args.methods,P,tol,ns,args.explicit_on_stiff):
+            out.write(json.dumps(r)+"\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,10 @@ def colloc(c,P,title):
     The "title" parameter is the name given to the generated Runge-Kurtta
     method.
 
+    The generated methods keep their continuous extension (the collocation
+    polynomial): Btheta[j] is the polynomial b_j(theta) of P, such that
+    y(t + theta h) = y + h sum_j b_j(theta) K_j (see RKintegrate).
+
     AUTHOR::
 
     Thierry Dumont (2016, 2020).
@@ -46,8 +50,10 @@ def colloc(c,P,title):
                   for i in range(0,n)])
     
     B = [prims[j](x = 1) - prims0[j] for j in range(0,n)]
+    # the continuous extension: b_j(theta), with b_j(1) = B[j].
+    Btheta = [prims[j] - prims0[j] for j in range(0,n)]
     # exactify to improve lisibility, if possible!
-    if R is AA or R is QQbar:
+    if Pb is AA or Pb is QQbar:
         for i in range(0,n):
             for j in range(0,n):
                 A[i,j].exactify()
@@ -59,7 +65,7 @@ def colloc(c,P,title):
         self.Title=title
         self.A = A
         self.B = vector(B)
-        RungeKutta.__init__(self,A,B,self.Title)
+        RungeKutta.__init__(self,A,B,self.Title,Btheta=Btheta)
         
     return type("Colloc"+str(len(c)),(RungeKutta,),{
         "__init__": constructor,
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+r"""
+Design of Runge-Kutta methods: solve the order conditions of a template.
+
+A template is a RungeKutta whose coefficients are polynomials (usually
+variables) of a multivariate polynomial ring over QQ: the unknowns are the
+generators of the ring (see explicit_template and sdirk_template).
+
+The pipeline is:
+
+1. order_equations: the order conditions (see RKTrees.order_conditions),
+   reduced by the simplifying assumption C(q) (stage order q), which are
+   added to the system: when C(q) holds, the condition of a tree which has
+   a bushy subtree [tau^(k-1)] (k <= q nodes, not at the root) is the one
+   of the tree where this subtree is replaced by k leaves (HW I, section
+   II.7), so that only the other trees are kept.
+
+2. solve_exact: Groebner bases (zero dimensional systems: all the real
+   solutions, in AA; otherwise the families, given by the Groebner bases of
+   the minimal associated primes), or solve_numerical: Newton (least
+   squares) iterations from many random starting points, in floating point,
+   distributed over processes.
+
+3. refine and recognize: floating point solutions are refined (Newton, in
+   high precision) and their coordinates recognized as rationals or
+   algebraic numbers of small degree.
+
+4. The exact solutions are checked by RKformula.order(); for floating
+   point ones, the order is estimated (numerical_order).
+
+EXAMPLES::
+
+sage: T = sdirk_template(2)
+sage: for r in design(T,3):
+....:     print(r["method"], r["order"])
+sage: T = explicit_template(4)
+sage: R = design(T,4,solver="numerical",starts=64)
+"""
+from sage.all import *
+from .RKRungeKutta import RungeKutta
+from .RKTrees import RKTrees
+from .RKTreeTables import level_sequence_to_parents
+from .RKformula import RKformula
+import os
+import numpy
+import multiprocessing
+import scipy.optimize
+#
+def explicit_template(s,Title=None):
+    """
+    The template of the explicit methods with s stages: unknowns a_i_j
+    (i > j) and b_i (stages are numbered from 1).
+    """
+    names = ["a%d_%d" % (i,j) for i in range(1,s+1) for j in range(1,i)]+\
+        ["b%d" % i for i in range(1,s+1)]
+    R = PolynomialRing(QQ,names,len(names))
+    g = dict(zip(names,R.gens()))
+    A = matrix(R,s,s,[g["a%d_%d" % (i,j)] if j < i else 0
+                      for i in range(1,s+1) for j in range(1,s+1)])
+    B = vector(R,[g["b%d" % i] for i in range(1,s+1)])
+    return RungeKutta(A,B,Title if Title is not None else
+                      "explicit template (%d stages)" % s)
+def sdirk_template(s,gamma=None,Title=None):
+    """
+    The template of the SDIRK methods with s stages: unknowns a_i_j (i > j),
+    b_i, and the diagonal coefficient g (unless it is given: gamma).
+    """
+    names = ["a%d_%d" % (i,j) for i in range(1,s+1) for j in range(1,i)]+\
+        ["b%d" % i for i in range(1,s+1)]+([] if gamma is not None else ["g"])
+    R = PolynomialRing(QQ,names,len(names))
+    g = dict(zip(names,R.gens()))
+    d = R(gamma) if gamma is not None else g["g"]
+    A = matrix(R,s,s,[g["a%d_%d" % (i,j)] if j < i else (d if j == i else 0)
+                      for i in range(1,s+1) for j in range(1,s+1)])
+    B = vector(R,[g["b%d" % i] for i in range(1,s+1)])
+    return RungeKutta(A,B,Title if Title is not None else
+                      "SDIRK template (%d stages)" % s)
+#
+def reducible_by_C(parents,q):
+    """
+    Is the condition of the tree (given by its parent array) a consequence
+    of C(q) and of the condition of a smaller tree ? (a node which is not
+    the root has k-1 >= 1 sons, all leaves, with k <= q).
+    """
+    sons = [0 for i in range(0,len(parents))]
+    for p in parents:
+        if p >= 0:
+            sons[p]+= 1
+    for v in range(0,len(parents)):
+        if parents[v] >= 0 and 1 <= sons[v] <= q-1 and \
+           all(sons[u] == 0 for u in range(0,len(parents))
+               if parents[u] == v):
+            return True
+    return False
+def order_equations(F,order,stage_order=1,lazy=False):
+    """
+    The polynomial equations (in the ring of the coefficients of the
+    template F) which ensure the order 'order' and the stage order
+    'stage_order': C(q) for q = stage_order, and the conditions of the
+    rooted trees which are not reducible by C(q) (see reducible_by_C).
+    """
+    R = F.A.base_ring()
+    A = F.A
+    B = F.B
+    s = len(B)
+    one = vector(R,[1 for i in range(0,s)])
+    c = A*one
+    def gen():
+        # C(k), k <= q (C(1) is c = A 1):
+        ck = c
+        for k in range(2,stage_order+1):
+            for x in A*ck-ck.pairwise_product(c)*(QQ(1)/k):
+                if x != 0:
+                    yield x
+            ck = ck.pairwise_product(c)
+        T = RKTrees()
+        for levels,x in T.order_conditions(A,B,order,with_trees=True):
+            if stage_order >= 2 and reducible_by_C(
+                    level_sequence_to_parents(levels),stage_order):
+                continue
+            if x != 0:
+                yield x
+    return gen() if lazy else list(gen())
+#
+def solve_exact(equations,R=None,real=True):
+    """
+    Solve the polynomial system with Groebner bases. Return (dimension,
+    solutions): for a zero dimensional system, the list of the solutions
+    (dictionaries generator -> value, in AA if real, otherwise in QQbar);
+    otherwise, the Groebner bases of the minimal associated primes of the
+    ideal (the families of solutions).
+    """
+    if R is None:
+        R = equations[0].parent()
+    I = R.ideal(equations)
+    d = I.dimension()
+    if d == 0:
+        return d,I.variety(AA if real else QQbar)
+    if d < 0:
+        return d,[]
+    return d,[P.groebner_basis() for P in I.minimal_associated_primes()]
+#
+def _compile(equations,gens):
+    # each polynomial as (coefficients, exponents) numpy arrays.
+    n = len(gens)
+    L = []
+    for p in equations:
+        d = p.dict()
+        E = numpy.array([list(e) for e in d],dtype=float).reshape((len(d),n))
+        c = numpy.array([float(v) for v in d.values()])
+        L.append((c,E))
+    return L
+def _residual(P,x):
+    return numpy.array([numpy.dot(c,numpy.prod(x**E,axis=1)) for c,E in P])
+def _jacobian(P,x):
+    n = len(x)
+    J = numpy.zeros((len(P),n))
+    for i,(c,E) in enumerate(P):
+        for k in range(0,n):
+            Ek = E.copy()
+            Ek[:,k]-= 1
+            m = E[:,k] != 0
+            if m.any():
+                J[i,k] = numpy.dot(c[m]*E[m,k],numpy.prod(x**Ek[m],axis=1))
+    return J
+def _least_squares(task):
+    # one start: Levenberg-Marquardt (or trust region if the system has
+    # less equations than unknowns).
+    P,x0,tol,maxiter = task
+    method = "lm" if len(P) >= len(x0) else "trf"
+    try:
+        r = scipy.optimize.least_squares(lambda x: _residual(P,x),x0,
+                                         jac=lambda x: _jacobian(P,x),
+                                         method=method,xtol=tol,ftol=tol,
+                                         gtol=tol,max_nfev=maxiter)
+        return r.x,float(numpy.max(numpy.abs(r.fun)))
+    except (ValueError,numpy.linalg.LinAlgError):
+        return x0,float("inf")
+def solve_numerical(equations,R=None,starts=100,box=(-1,1),processes=None,
+                    seed=0,tol=1.e-12,maxiter=2000):
+    """
+    Solve the polynomial system in floating point: least squares Newton
+    iterations from 'starts' random points of box^n, run by 'processes'
+    worker processes (default: number of cores).
+
+    Return the list of the distinct solutions found (numpy arrays, in the
+    order of R.gens()), with their residual (max norm), sorted by residual;
+    only the solutions with a residual < sqrt(tol) are kept.
+    """
+    if R is None:
+        R = equations[0].parent()
+    P = _compile(equations,R.gens())
+    rng = numpy.random.RandomState(seed)
+    tasks = [(P,rng.uniform(box[0],box[1],R.ngens()),tol,maxiter)
+             for k in range(0,starts)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes > 1:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            res = pool.map(_least_squares,tasks)
+    else:
+        res = [_least_squares(t) for t in tasks]
+    sols = []
+    for x,r in sorted(res,key=lambda t: t[1]):
+        if r < numpy.sqrt(tol) and \
+           all(numpy.max(numpy.abs(x-y)) > 1.e-6 for y,ry in sols):
+            sols.append((x,r))
+    return sols
+#
+def refine(equations,x,prec=200,maxiter=50):
+    """
+    Refine a floating point solution x by Gauss-Newton iterations in
+    RealField(prec). When there are less equations than unknowns, the step
+    is the minimum norm solution of the linearized system, J^T (J J^T)^{-1}
+    (-F): x is then moved to the nearest point (at first order) of the set
+    of solutions.
+    """
+    RF = RealField(prec)
+    R = equations[0].parent()
+    y = vector(RF,[RF(v) for v in x])
+    under = len(equations) < R.ngens()
+    J = [[p.derivative(g) for g in R.gens()] for p in equations]
+    eps = RF(2)**(-prec+10)
+    for it in range(0,maxiter):
+        Fy = vector(RF,[p(*y) for p in equations])
+        Jy = matrix(RF,[[q(*y) for q in row] for row in J])
+        try:
+            if under:
+                d = Jy.transpose()*(Jy*Jy.transpose()).solve_right(-Fy)
+            else:
+                d = (Jy.transpose()*Jy).solve_right(-Jy.transpose()*Fy)
+        except (ValueError,ZeroDivisionError):
+            break
+        y+= d
+        if max([abs(v) for v in d]) <= eps*max(1,max([abs(v) for v in y])):
+            break
+    return y
+def recognize(y,degree=4):
+    """
+    Recognize the real number y (a high precision approximation): return a
+    rational, or an algebraic number (in AA) of degree <= degree, whose
+    distance to y is about the precision of y; None otherwise.
+    """
+    prec = y.parent().precision()
+    eps = y.parent()(2)**(-(prec*3)//4)
+    q = y.nearby_rational(max_error=eps)
+    if q.height() < 2**(prec//4):
+        return q
+    for d in range(2,degree+1):
+        p = algdep(y,d)
+        if p.degree() < 1 or max([abs(c) for c in p.list()]) > 2**(prec//(2*d)):
+            continue
+        r = [a for a in p.roots(AA,multiplicities=False)
+             if abs(y-a.n(prec)) < eps]
+        if r:
+            return r[0]
+    return None
+#
+def instantiate(F,values,Title=None,exact=True):
+    """
+    The RungeKutta obtained by giving the values (dictionary generator ->
+    value, or list in the order of the generators) to the unknowns of the
+    template F; exact=False for floating point values (in RDF).
+    """
+    R = F.A.base_ring()
+    if not isinstance(values,dict):
+        values = dict(zip(R.gens(),values))
+    v = [values[g] for g in R.gens()]
+    D = AA if exact else RDF
+    s = len(F.B)
+    A = matrix(D,s,s,[D(a(*v)) for a in F.A.list()])
+    B = vector(D,[D(b(*v)) for b in F.B])
+    return RungeKutta(A,B,Title if Title is not None else F.Title,
+                      exact=exact)
+def numerical_order(M,tol=1.e-8):
+    """
+    The order of the floating point method M, up to tol: the largest p such
+    that |gamma(t)*Phi(t)-1| < tol for all the trees with at most p nodes.
+    """
+    T = RKTrees()
+    A = matrix(RDF,M.A)
+    B = vector(RDF,M.B)
+    p = 0
+    while p < 2*len(B) and all(abs(x) < tol for x in
+                               T.make_order_equations(A,B,p+1)):
+        p+= 1
+    return p
+def design(F,order,stage_order=1,solver="groebner",degree=4,**kwargs):
+    """
+    Find methods of order 'order' (and stage order 'stage_order') with the
+    structure of the template F; solver = "groebner" (see solve_exact) or
+    "numerical" (see solve_numerical; kwargs are passed to it).
+
+    Return a list of dictionaries:
+
+    - "solution": the values of the unknowns (exact, or floating point),
+
+    - "method": the RungeKutta (None for a family of solutions, with
+      solver="groebner": then "family" is the Groebner basis),
+
+    - "exact": are the coefficients exact ?
+
+    - "order": the order (computed by RKformula.order() for exact
+      methods; for floating point ones, see numerical_order).
+
+    Floating point solutions are refined and recognized (see refine and
+    recognize) when possible, and then verified exactly.
+    """
+    E = order_equations(F,order,stage_order)
+    R = F.A.base_ring()
+    res = []
+    if solver == "groebner":
+        d,S = solve_exact(E,R)
+        if d > 0:
+            return [{"solution": None,"method": None,"family": G,
+                     "exact": True,"order": None} for G in S]
+        for sol in S:
+            M = instantiate(F,sol)
+            res.append({"solution": sol,"method": M,"exact": True,
+                        "order": RKformula(M).order()})
+        return res
+    for x,r in solve_numerical(E,R,**kwargs):
+        y = refine(E,x)
+        z = [recognize(v,degree) for v in y]
+        if all(v is not None for v in z):
+            M = instantiate(F,z)
+            p = RKformula(M).order()
+            if p >= order:
+                res.append({"solution": dict(zip(R.gens(),z)),"method": M,
+                            "exact": True,"order": p,"residual": r})
+                continue
+        M = instantiate(F,[RDF(v) for v in y],exact=False)
+        res.append({"solution": dict(zip(R.gens(),y)),"method": M,
+                    "exact": False,"residual": r,
+                    "order": numerical_order(M)})
+    return res
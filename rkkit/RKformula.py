@@ -26,7 +26,15 @@ from .RKTrees import *
 #
 from .RKExceptions import *
 from .RKPolutilities import *
+from .RKCache import PropertyCache, property_key
+from .RKStore import tableau_hash, default_store
+from .RKscheduler import compute_properties
+from .RKFields import smallest_exact_field, to_AA, to_QQbar
+from .RKreduce import reduced_method
+from .RKAstability import roots_in_half_planes, E_polynomial, \
+    is_nonnegative_on_real_line, is_A_stable
 #
+import time
 import functools
 #
 class  RKformula(SageObject):
@@ -39,41 +47,111 @@ class  RKformula(SageObject):
     sage: F = RKformula(A,B)
     
     """
-    def __init__(self,F):
+    def __init__(self,F,cache_size=None,cache_bytes=None,store=None,
+                 reduce=False):
         """
         Initilalize ``self``. F is a Runge-Kutta class.
 
+        cache_size, cache_bytes: bounds (number of entries, estimated size)
+        for the cache of computed properties (see RKCache); default: no bound.
+
+        store: a PropertyStore (see RKStore), where computed properties are
+        searched and saved; default: given by the environment variable
+        RKKIT_STORE, if set, otherwise no store.
+
+        reduce: if True, work on the equivalent irreducible method (see
+        RKreduce), which is cheaper to analyse when it has less stages;
+        self.stage_map[i] is then the stage of this method equal to the
+        stage i of F (None: the stage does not influence the solution).
+
         EXAMPLES::
         
         sage: R = RK4()
         sage: F = RKformula(R)
         """
        
+        self.stage_map = None
+        if reduce:
+            F,self.stage_map = reduced_method(F)
         # force coefficients to live in AA:
         self.A = F.A.change_ring(AA)
         self.B = vector([ AA(b) for b in F.B])
         self.C = vector([ AA(c) for c in F.C])
+        self.Title = getattr(F,"Title","")
+        Bhat = getattr(F,"Bhat",None)
+        self.Bhat = vector([AA(b) for b in Bhat]) if Bhat is not None \
+            else None
         self.D = AA
         self.R =  PolynomialRing(AA, 'z')
         self.s = self.A.dimensions()[1]
+        # but compute in the smallest exact field K containing them (QQ or
+        # a number field), and go back to AA only when needed:
+        s = self.s
+        nc = len(self.C)
+        self.K,elts,self.embedding = smallest_exact_field(
+            self.A.list()+list(self.B)+list(self.C)+
+            (list(self.Bhat) if self.Bhat is not None else []))
+        self.AK = matrix(self.K,s,s,elts[:s*s])
+        self.BK = vector(self.K,elts[s*s:s*s+s])
+        self.CK = vector(self.K,elts[s*s+s:s*s+s+nc])
+        self.BhatK = vector(self.K,elts[s*s+s+nc:]) \
+            if self.Bhat is not None else None
+        self.RK = PolynomialRing(self.K,'z')
+        # rooted trees, and the stage vectors of (A,B), are kept from one
+        # order to the next:
+        self.RTrees = RKTrees()
         # as computing properties can be slow, we will cache them here as
         # soon as they are computed:
-        self.known_properties={}
+        self.known_properties=PropertyCache(cache_size,cache_bytes)
+        # on disk store, shared by all processes:
+        self.store = store if store is not None else default_store()
+        self._hash = None
 
            
     def _persistance(foo):
         """
-        Decorator: caches results of "foo" in self.known_properties
+        Decorator: caches results of "foo" in self.known_properties, keyed
+        by the name of foo and its arguments (and in self.store, if any).
         """
         @functools.wraps(foo)
         def magic( self, *args, **kwargs ):
-            if foo.__name__ in self.known_properties:
-                return self.known_properties[foo.__name__]
-            else:
+            key = property_key(foo.__name__,args,kwargs)
+            known,x = self.known_properties.lookup(foo.__name__,key)
+            if not known and self.store is not None:
+                known,x = self.store.get(self.tableau_hash(),key)
+                if known:
+                    self.known_properties.store(foo.__name__,key,x)
+            if not known:
+                t = time.time()
                 x=foo( self,  *args, **kwargs )
-                self.known_properties[foo.__name__]=x
-                return x
+                self.known_properties.store(foo.__name__,key,x,time.time()-t)
+                if self.store is not None:
+                    self.store.put(self.tableau_hash(),key,x)
+            return x
         return magic
+
+    def tableau_hash(self):
+        """
+        Canonical hash of the exact Butcher array (see RKStore).
+        """
+        if self._hash is None:
+            self._hash = tableau_hash(self.A,self.B,self.C,self.Bhat)
+        return self._hash
+
+    def to_AA(self,x):
+        """
+        The element x of self.K, as a real algebraic number.
+        """
+        return to_AA(x,self.embedding)
+
+    def to_R(self,f):
+        """
+        The rational function f, with coefficients in self.K, as a
+        rational function with coefficients in AA.
+        """
+        N = self.R([self.to_AA(c) for c in f.numerator().list()])
+        D = self.R([self.to_AA(c) for c in f.denominator().list()])
+        return N/D
     
     def _latex_(self):
         r"""
@@ -93,19 +171,102 @@ class  RKformula(SageObject):
 
         Compute the stability function.
 
+        It is computed in self.K (see stability_function_in_K), but has
+        coefficients in AA.
+
         EXAMPLES::
 
         sage: F.stability_function()
 
         (1/3*z + 1)/(1/6*z^2 - 2/3*z + 1)
         """
-        z = self.R.gen()
-        Rng = self.D
-        K = matrix(Rng,[self.B for i in range(0,self.s)])
-        II = identity_matrix(Rng,self.s)
-        D = II - z*self.A
-        N = D + z*K
-        return N.determinant()/D.determinant()
+        return self.to_R(self.stability_function_in_K())
+
+    @_persistance
+    def stability_function_in_K(self):
+        """
+        The stability function, with coefficients in self.K, computed by
+        the method chosen by stability_function_method().
+        """
+        return self._stability_function_in_K_by(
+            self.stability_function_method())
+
+    def stability_function_method(self):
+        """
+        Choose how to compute the stability function: symbolic determinants
+        for small methods, else evaluation/interpolation (self.K is a field);
+        fraction free elimination is still available with
+        stability_function_by("elimination").
+        """
+        if self.s <= 2:
+            return "determinants"
+        else:
+            return "interpolation"
+
+    def stability_function_by(self,method):
+        """
+        Compute the stability function R(z) = N(z)/D(z), with
+        D(z) = det(I - zA) and N(z) = det(I - zA + z 1 B^T), using 'method':
+
+        - "determinants": determinants of matrices over the polynomial ring,
+
+        - "interpolation": as N and D are of degree <= s, evaluate the
+          determinants (of matrices over the base field) in z = 0, ... ,s,
+          and interpolate,
+
+        - "elimination": fraction free (Bareiss) elimination of the
+          bordered matrix [[I - zA, -1], [z B^T, 1]], whose determinant is
+          D(z)(1 + z B^T (I - zA)^{-1} 1) = N(z); its leading minor of
+          size s is D(z).
+
+        All give the same rational function. Computations are done in
+        self.K, the result has coefficients in AA.
+        """
+        return self.to_R(self._stability_function_in_K_by(method))
+
+    def _stability_function_in_K_by(self,method,B=None):
+        # B: the weights (default: self.BK).
+        z = self.RK.gen()
+        Rng = self.K
+        s = self.s
+        B = self.BK if B is None else B
+        if method == "determinants":
+            K = matrix(Rng,[B for i in range(0,s)])
+            II = identity_matrix(Rng,s)
+            D = II - z*self.AK
+            N = D + z*K
+            return N.determinant()/D.determinant()
+        elif method == "interpolation":
+            K = matrix(Rng,[B for i in range(0,s)])
+            II = identity_matrix(Rng,s)
+            PN = []
+            PD = []
+            for k in range(0,s+1):
+                zk = Rng(k)
+                D = II - zk*self.AK
+                N = D + zk*K
+                PN.append((zk,N.determinant()))
+                PD.append((zk,D.determinant()))
+            return self.RK.lagrange_polynomial(PN)/ \
+                self.RK.lagrange_polynomial(PD)
+        elif method == "elimination":
+            M = matrix(self.RK,s+1,s+1)
+            for i in range(0,s):
+                for j in range(0,s):
+                    M[i,j] = -z*self.AK[i,j]
+                M[i,i]+= 1
+                M[i,s] = -1
+                M[s,i] = z*B[i]
+            M[s,s] = 1
+            prev = self.RK(1)
+            for k in range(0,s):
+                for i in range(k+1,s+1):
+                    for j in range(k+1,s+1):
+                        M[i,j] = (M[i,j]*M[k,k]-M[i,k]*M[k,j])//prev
+                prev = M[k,k]
+            return M[s,s]/M[s-1,s-1]
+        else:
+            raise ValueError("stability_function_by: unknown method "+method)
 
     @_persistance    
     def A_is_invertible(self):
@@ -119,7 +280,23 @@ class  RKformula(SageObject):
         
         True
         """
-        return self.A.is_invertible()
+        return self.AK.is_invertible()
+
+    @_persistance
+    def A_diagonalization(self):
+        """
+
+        Exact diagonalization of A, in QQbar: (D,P) with A = P D P^(-1), D
+        diagonal (None if A is not diagonalizable). Used to decouple the
+        stage equations of implicit methods (see RKintegrate).
+
+        """
+        A = matrix(QQbar,self.s,self.s,[to_QQbar(a,self.embedding)
+                                        for a in self.AK.list()])
+        D,P = A.eigenmatrix_right()
+        if P.nrows() != P.ncols() or not P.is_invertible():
+            return None
+        return D,P
 
     @_persistance 
     def is_explicit(self):
@@ -138,7 +315,12 @@ class  RKformula(SageObject):
     @_persistance   
     def poles_of_stability_function(self):
         """
-        Compute the poles of the stability function, if any.
+        Compute the poles of the stability function, if any, in QQbar.
+
+        This can be very expensive (or fail, raising RootsException) for
+        large methods: it is computed only on request, and is not one of
+        the all_properties (the properties which depend on the poles locate
+        them without computing them, see RKAstability).
         """
         if self.is_explicit():
             return []
@@ -155,12 +337,15 @@ class  RKformula(SageObject):
         """
         Documentation is in the name of this method!
 
-        Returns: (all poles have >=0 real part?) and number of poles==0.
+        Returns: (all poles have >=0 real part?) and number of poles with
+        real part ==0.
+
+        The poles are not computed: they are located by the Routh-Hurwitz
+        theorem (see RKAstability.roots_in_half_planes).
         """
-        Poles = self.poles_of_stability_function()
-        llp = all(s[0].real()>=0 for s in Poles)
-        llzero = len([s for s in Poles if s[0].real()==0 ])
-        return llp,llzero
+        Q = self.stability_function_in_K().denominator()
+        nleft,nright,naxis = roots_in_half_planes(Q,self.embedding)
+        return nleft == 0,naxis
     
     @_persistance
     def order_of_stability_function(self):
@@ -183,28 +368,30 @@ class  RKformula(SageObject):
     @_persistance
     def stability_function_on_im_axis(self):
         """
-        Trace of the stability function on the imaginary axis.
+        Trace of the stability function on the imaginary axis: R(i x), as
+        a rational function of x (with coefficients in QQbar).
         """
         R = self.stability_function()
-        P = AA['x']
-        x = P.gen()
-        return R(z = QQbar(I)*x)
+        P = QQbar['x']
+        Ne,No = imaginary_axis_split(R.numerator())
+        De,Do = imaginary_axis_split(R.denominator())
+        i = QQbar(I)
+        return (P(Ne.list())+i*P(No.list()))/(P(De.list())+i*P(Do.list()))
 
     @_persistance
     def squared_module_of_stability_function_on_Im(self):
         """
         Square of the module of the trace of the stability function on
-        the imaginary axis.
-        """
-        RIaxe = self.stability_function_on_im_axis()
-        RIaxeN = RIaxe.numerator()
-        RIaxeD = RIaxe.denominator()
-        m2N = RIaxeN*conj(RIaxeD) 
-        m2NR = realpart(m2N)
-        m2NI = impart(m2N)
-        m2n = generic_power(m2NR,2)+generic_power(m2NI,2)
-        m2d = RIaxeD*conj(RIaxeD)
-        return m2n/generic_power(m2d,2)
+        the imaginary axis: |R(iy)|^2, as a rational function of y (with
+        coefficients in AA).
+
+        It is computed in self.K, from the even and odd parts of the
+        numerator and of the denominator (see
+        squared_module_on_imaginary_axis).
+        """
+        R = self.stability_function_in_K()
+        return self.to_R(squared_module_on_imaginary_axis(R.numerator())/
+                         squared_module_on_imaginary_axis(R.denominator()))
     
     @_persistance
     def is_module_of_stability_function_constant_on_Im(self):
@@ -219,29 +406,15 @@ class  RKformula(SageObject):
     def is_module_of_stability_function_less_than_1(self):
         """
         Is the module of the trace of the stability funtion on the
-        imaginary axis <1 ?
+        imaginary axis <=1 ?
+
+        With R = P/Q, this is E(y) = |Q(iy)|^2 - |P(iy)|^2 >= 0 for all
+        real y, which is decided by a Sturm sequence of E (see
+        RKAstability), in the field of the coefficients.
         """
-        is_const = self.is_module_of_stability_function_constant_on_Im()
-        if is_const:
-            return True
-        else:
-            m2 = self.squared_module_of_stability_function_on_Im()
-            l1,ok,n = roots_checked(m2.numerator()-m2.denominator(),QQbar)
-            if not ok:
-                raise RootsException(n,m2.numerator()-m2.denominator())
-            else:
-                l1m1 = [s[0] for s in l1 if s[0].imag()==0 ]
-                l1m1realp = [s.real() for s in l1m1 if s >= 0]
-                l1r = len(l1m1realp)
-                if l1r==1:
-                    # module value is 0, only in x == 0.
-                    return  m2(z=1) <1
-                else:
-                    points = [(l1m1realp[i]+l1m1realp[i+1])/2 \
-                              for i in range(0,l1r-1)]
-                    points.append(l1m1realp[l1r-1]*3/2)
-                    signes = [sign(abs(m2(x = s).real())-1) for s in points]
-                    return len([x for x in signes if x >=0]) == 0
+        R = self.stability_function_in_K()
+        E = E_polynomial(R.numerator(),R.denominator())
+        return is_nonnegative_on_real_line(E,self.embedding)
     
     @_persistance    
     def is_A_stable(self):
@@ -250,9 +423,8 @@ class  RKformula(SageObject):
 
         See: HW II , second edition, page 43.
         """
-        return  (self.is_module_of_stability_function_constant_on_Im() or \
-                 self.is_module_of_stability_function_less_than_1()) and  \
-                 self.real_part_of_poles_all_positive()[0]
+        return self.is_module_of_stability_function_less_than_1() and  \
+            self.real_part_of_poles_all_positive()[0]
 
     @_persistance
     def is_stiffly_accurate(self):
@@ -273,9 +445,9 @@ class  RKformula(SageObject):
         R(\infty). See Hairer-Wanner t.II pages 45 and 375.
         """
         if self.A_is_invertible():
-            AI = self.A.inverse()
-            One = vector([AA(1) for i in range(0,self.s)])
-            ret = AA(1)-self.B.dot_product(AI*One)
+            AI = self.AK.inverse()
+            One = vector([self.K(1) for i in range(0,self.s)])
+            ret = self.to_AA(1-self.BK.dot_product(AI*One))
             ret.exactify()
             return ret
         else:
@@ -302,12 +474,13 @@ class  RKformula(SageObject):
         conserve_quadratic_invariants(self).
 
         """
-        B = self.B
-        A = self.A
+        B = self.BK
+        A = self.AK
         M = matrix(QQbar,self.s,self.s)
         for i in range(0,self.s):
             for j in range(0,self.s):
-                M[i,j] = B[i]*A[i,j]+B[j]*A[j,i]-B[i]*B[j]
+                M[i,j] = to_QQbar(B[i]*A[i,j]+B[j]*A[j,i]-B[i]*B[j],
+                                  self.embedding)
         return M
     
     @_persistance    
@@ -329,12 +502,12 @@ class  RKformula(SageObject):
         """
         All is in the title.
         """
-        P = matrix(AA,self.s,self.s)
+        P = matrix(self.K,self.s,self.s)
         for i in range(0,self.s):
             P[i,self.s-i-1]=1
-        PA =P *self.A+ self.A*P
-        return all(self.B == Row for Row in PA.rows()) and \
-            self.B == P*self.B
+        PA =P *self.AK+ self.AK*P
+        return all(self.BK == Row for Row in PA.rows()) and \
+            self.BK == P*self.BK
 
     @_persistance    
     def conserve_quadratic_invariants(self):
@@ -364,20 +537,18 @@ class  RKformula(SageObject):
         Check rooted tree at order 'order'.
 
         """
-        self.RTrees = RKTrees()
         t = False
         for i in range(1,order+1):
-            t = self.RTrees.check_order(self.A,self.B,i)
+            t = self.RTrees.check_order(self.AK,self.BK,i)
             if not t:
                 break
         return t #True iff formula is at least of order "order".
     
     @_persistance
     def make_order_equations(self,order):
-        self.RTrees = RKTrees()
         s=[]
         for i in range(1,order+1):
-            s+=self.RTrees.make_order_equations(self.A,self.B,i)
+            s+=self.RTrees.make_order_equations(self.AK,self.BK,i)
         return s
     @_persistance
     def stability_on_real_negative_axis(self):
@@ -398,17 +569,257 @@ class  RKformula(SageObject):
             else:
                 return r[0]
  
+    def _simplifying_levels(self,B):
+        # the largest p, eta, zeta such that B(p), C(eta) and D(zeta) hold
+        # for (A,B), with c = A (1,...,1) (levels are bounded by 2s+1).
+        s = self.s
+        A = self.AK
+        one = vector(self.K,[1 for i in range(0,s)])
+        c = A*one
+        bound = 2*s+1
+        # B(p): sum_i b_i c_i^(k-1) = 1/k, k <= p.
+        p = 0
+        ck = one
+        while p < bound and B.dot_product(ck) == QQ(1)/(p+1):
+            p+= 1
+            ck = ck.pairwise_product(c)
+        # C(eta): sum_j a_ij c_j^(k-1) = c_i^k/k, k <= eta.
+        eta = 0
+        ck = one
+        while eta < bound and A*ck == ck.pairwise_product(c)/(eta+1):
+            eta+= 1
+            ck = ck.pairwise_product(c)
+        # D(zeta): sum_i b_i c_i^(k-1) a_ij = b_j (1-c_j^k)/k, k <= zeta.
+        zeta = 0
+        ck = one
+        while zeta < bound:
+            ck1 = ck.pairwise_product(c)
+            if B.pairwise_product(ck)*A != B.pairwise_product(one-ck1)/(zeta+1):
+                break
+            zeta+= 1
+            ck = ck1
+        return p,eta,zeta
+
+    def _order_of(self,B):
+        # order of (A,B): Butcher's theorem (HW I, section II.7) proves the
+        # order min(p, eta+zeta+1, 2 eta+2) from B(p), C(eta), D(zeta); the
+        # order is at most p (B(p) are the conditions of the bushy trees),
+        # rooted trees decide in between.
+        p,eta,zeta = self._simplifying_levels(B)
+        o = min(p,eta+zeta+1,2*eta+2)
+        while o < p and self.RTrees.check_order(self.AK,B,o+1):
+            o+= 1
+        return o
+
+    @_persistance
+    def simplifying_assumptions(self):
+        """
+
+        The levels (p, eta, zeta) of the simplifying assumptions: the
+        largest integers such that B(p), C(eta) and D(zeta) hold (HW I,
+        section II.7):
+
+        B(p): sum_i b_i c_i^(k-1) = 1/k, for k <= p,
+
+        C(eta): sum_j a_ij c_j^(k-1) = c_i^k/k, for all i and k <= eta,
+
+        D(zeta): sum_i b_i c_i^(k-1) a_ij = b_j (1-c_j^k)/k, for all j and
+        k <= zeta,
+
+        with c = A (1,...,1). This needs O(p s^2) operations, no rooted tree.
+
+        EXAMPLES::
+
+        sage: RKformula(Radau5()).simplifying_assumptions()
+        (5, 2, 3)
+        """
+        return self._simplifying_levels(self.BK)
+
+    @_persistance
+    def stage_order(self):
+        """
+
+        The stage order: the largest q such that B(q) and C(q) hold.
+
+        """
+        p,eta,zeta = self.simplifying_assumptions()
+        return min(p,eta)
+
     @_persistance
     def order(self):
         """
 
-        Compute order of the method using rooted trees.
+        Compute order of the method: the order given by the simplifying
+        assumptions (see simplifying_assumptions) is certified without
+        trees; rooted trees are only checked for the orders which remain
+        undecided.
 
         """
-        o = 0
-        while self.check_order_using_rooted_trees(o+1):
-            o+= 1
-        return o
+        return self._order_of(self.BK)
+
+    @_persistance
+    def error_coefficients(self,n):
+        r"""
+
+        The error coefficients of the rooted trees with n nodes, in the
+        order of the TreeTable (see RKTreeTables):
+
+        (\Phi(t) - 1/\gamma(t)) / \sigma(t),
+
+        computed in self.K, returned in AA. The stage vectors kept by
+        RKTrees are reused if the order was checked in this process; they
+        are not sent back by the workers of RKscheduler, and are then
+        computed again.
+
+        """
+        self.RTrees.expand(n)
+        W = self.RTrees.weights(self.AK,self.BK)
+        T = self.RTrees.dtrees[n]
+        return [self.to_AA((W.weight(T.parents_of(k))-QQ(1)/T.gamma[k])/
+                           T.sigma[k]) for k in range(0,T.ntrees)]
+
+    def error_norms(self,n):
+        """
+
+        (2-norm, max-norm) of the error coefficients of the rooted trees
+        with n nodes.
+
+        """
+        e = self.error_coefficients(n)
+        return (sum([x*x for x in e]).sqrt(),max([abs(x) for x in e]))
+
+    @_persistance
+    def principal_error_norm(self):
+        """
+
+        (2-norm, max-norm) of the error coefficients of order p+1, p being
+        the order of the method: the leading term of the local error.
+
+        """
+        return self.error_norms(self.order()+1)
+
+    @_persistance
+    def secondary_error_norm(self):
+        """
+
+        (2-norm, max-norm) of the error coefficients of order p+2.
+
+        """
+        return self.error_norms(self.order()+2)
+
+    @_persistance
+    def dense_output_weights(self,order):
+        """
+
+        Weights b_j(theta) of a continuous extension of order 'order':
+        y(t + theta h) = y + h sum_j b_j(theta) K_j, with b_j(1) = B[j].
+
+        They are polynomials of degree <= order in theta, without constant
+        term, which satisfy the order conditions of the rooted trees t with
+        at most 'order' nodes (HNW I, section II.6):
+
+        sum_j b_j(theta) Phi_j(t) = theta^|t| / gamma(t),
+
+        where Phi_j(t) are the components of the stage vectors (see
+        RKWeights). This is a linear system in the coefficients of the
+        b_j, solved in self.K; if it has several solutions, one of them is
+        returned. Raise NoContinuousExtension if there is none.
+
+        Return the list of the b_j, polynomials in theta over AA.
+
+        EXAMPLES::
+
+        sage: F = RKformula(DormandPrince())
+        sage: F.dense_output_weights(4)
+        """
+        s = self.s
+        W = self.RTrees.weights(self.AK,self.BK)
+        self.RTrees.expand(order)
+        # unknowns: coefficient of theta^k in b_j, at index j*order+k-1.
+        rows = []
+        rhs = []
+        for n in range(1,order+1):
+            T = self.RTrees.dtrees[n]
+            for t in range(0,T.ntrees):
+                g = W.stage_vector(W.tree_key(T.parents_of(t)))
+                for k in range(1,order+1):
+                    row = [0]*(s*order)
+                    for j in range(0,s):
+                        row[j*order+k-1] = g[j]
+                    rows.append(row)
+                    rhs.append(QQ(1)/T.gamma[t] if k == n else 0)
+        # b_j(1) = B[j]:
+        for j in range(0,s):
+            row = [0]*(s*order)
+            for k in range(1,order+1):
+                row[j*order+k-1] = 1
+            rows.append(row)
+            rhs.append(self.BK[j])
+        M = matrix(self.K,rows)
+        try:
+            x = M.solve_right(vector(self.K,rhs))
+        except ValueError:
+            raise NoContinuousExtension(self.Title,order)
+        P = PolynomialRing(AA,'theta')
+        return [P([0]+[self.to_AA(x[j*order+k-1]) for k in range(1,order+1)])
+                for j in range(0,s)]
+
+    @_persistance
+    def dense_output_order(self):
+        """
+
+        The highest order (<= the order of the method) of a continuous
+        extension computed by dense_output_weights.
+
+        """
+        p = self.order()
+        while p > 1:
+            try:
+                self.dense_output_weights(p)
+                return p
+            except NoContinuousExtension:
+                p-= 1
+        return p
+
+    @_persistance
+    def embedded_order(self):
+        """
+
+        Compute the order of the embedded method (A,Bhat), using rooted
+        trees and simplifying assumptions, as order() (None if there is no
+        embedded method).
+
+        """
+        if self.BhatK is None:
+            return None
+        return self._order_of(self.BhatK)
+
+    @_persistance
+    def embedded_stability_function(self):
+        """
+
+        Stability function of the embedded method (A,Bhat) (None if there
+        is no embedded method).
+
+        """
+        if self.BhatK is None:
+            return None
+        return self.to_R(self._stability_function_in_K_by(
+            self.stability_function_method(),self.BhatK))
+
+    @_persistance
+    def is_embedded_A_stable(self):
+        """
+
+        Is the embedded method (A,Bhat) A-stable ? (None if there is no
+        embedded method).
+
+        """
+        if self.BhatK is None:
+            return None
+        R = self._stability_function_in_K_by(
+            self.stability_function_method(),self.BhatK)
+        return is_A_stable(R.numerator(),R.denominator(),self.embedding)
     
     @_persistance
     def order_star_function(self):
@@ -423,33 +834,79 @@ class  RKformula(SageObject):
         s=RRs(x+SR(I)*y)/exp(x+SR(I)*y)
         return s.abs()
 
-    def compute_all_properties(self):
+    # all the properties, in the order compute_all_properties computes them:
+    all_properties = ["A_is_invertible","is_explicit","stability_function",
+                      "real_part_of_poles_all_positive",
+                      "order_of_stability_function",
+                      "stability_function_on_im_axis",
+                      "squared_module_of_stability_function_on_Im",
+                      "is_module_of_stability_function_constant_on_Im",
+                      "is_module_of_stability_function_less_than_1",
+                      "is_A_stable","is_stiffly_accurate","is_L_stable",
+                      "is_algebraically_stable","is_Symmetric","is_Symplectic",
+                      "conserve_quadratic_invariants",
+                      "stability_on_real_negative_axis",
+                      "simplifying_assumptions","stage_order","order",
+                      "principal_error_norm","secondary_error_norm",
+                      "order_star_function","dense_output_order",
+                      "embedded_order",
+                      "embedded_stability_function","is_embedded_A_stable"]
+
+    # what each property needs (directly):
+    property_dependencies = {
+        "A_is_invertible": [],
+        "stability_function_in_K": [],
+        "stability_function": ["stability_function_in_K"],
+        "is_explicit": ["stability_function"],
+        "real_part_of_poles_all_positive": ["stability_function_in_K"],
+        "order_of_stability_function": ["stability_function"],
+        "stability_function_on_im_axis": ["stability_function"],
+        "squared_module_of_stability_function_on_Im":
+            ["stability_function_in_K"],
+        "is_module_of_stability_function_constant_on_Im":
+            ["squared_module_of_stability_function_on_Im"],
+        "is_module_of_stability_function_less_than_1":
+            ["stability_function_in_K"],
+        "is_A_stable": ["is_module_of_stability_function_less_than_1",
+                        "real_part_of_poles_all_positive"],
+        "is_stiffly_accurate": ["is_A_stable"],
+        "is_L_stable": ["is_A_stable"],
+        "M_matrix": [],
+        "is_algebraically_stable": ["is_explicit","M_matrix"],
+        "is_Symmetric": [],
+        "is_Symplectic": ["is_explicit","M_matrix"],
+        "conserve_quadratic_invariants": ["is_explicit","M_matrix"],
+        "stability_on_real_negative_axis": ["is_A_stable"],
+        "simplifying_assumptions": [],
+        "stage_order": ["simplifying_assumptions"],
+        "order": ["simplifying_assumptions"],
+        "principal_error_norm": ["order"],
+        "secondary_error_norm": ["order"],
+        "order_star_function": ["stability_function"],
+        "dense_output_order": ["order"],
+        "embedded_order": [],
+        "embedded_stability_function": [],
+        "is_embedded_A_stable": [],
+        }
+
+    def compute_properties(self,names=None,processes=1):
+        """
+
+        Compute the properties 'names' (default: all) and their
+        dependencies; with processes > 1 (None: number of cores),
+        independent properties are computed concurrently by worker
+        processes (see RKscheduler).
+
+        """
+        compute_properties(self,names,processes)
+
+    def compute_all_properties(self,processes=1):
         """
 
         Compute all possible properties of the formula.
 
         """
-        self.A_is_invertible()
-        self.is_explicit()
-        self.stability_function()
-        self.poles_of_stability_function()
-        self.real_part_of_poles_all_positive()
-        self.order_of_stability_function()
-        self.stability_function_on_im_axis()
-        self.squared_module_of_stability_function_on_Im()
-        self.is_module_of_stability_function_constant_on_Im()
-        self.is_module_of_stability_function_less_than_1()
-        self.is_A_stable()
-        self.is_stiffly_accurate()
-        self.is_L_stable()
-        self.is_algebraically_stable()
-        self.is_Symmetric()
-        self.is_Symplectic()
-        self.conserve_quadratic_invariants()
-        self.stability_on_real_negative_axis()
-        self.stability_on_real_negative_axis()
-        self.order()
-        self.order_star_function()
+        self.compute_properties(self.all_properties,processes)
         
     def print_all_known_properties(self):
         """
@@ -457,7 +914,9 @@ class  RKformula(SageObject):
         Print all already computed properties.
 
         """
-        donotprint=["A","B","C","D","R","s","RTrees","M_matrix"]
+        donotprint=["A","B","C","D","R","s","RTrees","M_matrix","K","AK","BK",
+                    "CK","RK","Bhat","BhatK","stability_function_in_K",
+                    "A_diagonalization"]
         D=self.known_properties
         for key in D:
             if key not in donotprint:
@@ -0,0 +1,668 @@
+# -*- coding: utf-8 -*-
+r"""
+Numerical integration of ODEs with the Butcher arrays of rkkit.
+
+The exact coefficients of a RungeKutta method are converted once to float64
+(numpy) arrays; the vector ODE y' = f(t,y) is then integrated with numpy.
+
+Integration can be batched: y may have a leading "ensemble" axis (many
+initial conditions, or parameter sets passed in 'args', integrated at once);
+f must then be vectorized along this axis: f(t,Y) receives Y of shape
+(p, n) and returns an array of the same shape.
+
+For explicit methods (A strictly lower triangular), the stages are computed
+one after the other, and the zero entries of A and B cost nothing.
+
+Implicit methods solve the stage equations by simplified Newton iterations
+(see HW II, section IV.8), with a Jacobian J which is kept, and factorized
+matrices which are reused, from one iteration and one step to the next (a
+new Jacobian is only computed when the iterations converge slowly, or do
+not converge). The structure of A decides how the (s n) x (s n) Newton
+system is solved:
+
+- "diagonal" (A lower triangular: DIRK, SDIRK methods): the stages are
+  solved one after the other; there is one n x n matrix I - h a_ii J to
+  factorize for each distinct diagonal coefficient (one for SDIRK methods).
+
+- "transformed" (A diagonalizable): A = T D T^(-1) is computed exactly by
+  RKformula.A_diagonalization, and the system decouples into n x n systems
+  I - h d_k J; for a pair of conjugate eigenvalues only one complex system
+  is solved (this is the real block diagonal form of A). Radau5 needs one
+  real and one complex factorization.
+
+- "full" (otherwise): the (s n) x (s n) matrix is factorized.
+
+Methods with embedded weights Bhat can be integrated with an adaptive step
+size (integrate_adaptive), controlled by a PI controller.
+
+Dense output: the solution inside a step is y(t + theta h) = y + h sum_j
+b_j(theta) K_j, where the b_j(theta) are the continuous extension kept by
+collocation methods (see RKcolloc), or computed from the order conditions
+(see RKformula.dense_output_weights). The solution at given times (t_eval),
+and the zeros of event functions, are obtained by interpolation, without
+reducing the steps.
+
+EXAMPLES::
+
+sage: I = RKintegrator(RK4)
+sage: f = lambda t,y: numpy.array([y[1],-y[0]])
+sage: t,Y = I.integrate(f,numpy.array([1.,0.]),(0,10),1000)
+sage: # 1000 harmonic oscillators, with different initial conditions:
+sage: g = lambda t,y: numpy.stack([y[:,1],-y[:,0]],axis=1)
+sage: t,Y = I.integrate(g,numpy.random.rand(1000,2),(0,10),1000)
+sage: # a stiff problem, with an implicit method:
+sage: J = RKintegrator(Radau5)
+sage: f = lambda t,y: numpy.array([-1000*(y[0]-cos(t))])
+sage: t,Y = J.integrate(f,numpy.array([0.]),(0,1),10)
+sage: # adaptive step size, with an embedded pair:
+sage: t,Y = RKintegrator(DormandPrince).integrate_adaptive(
+....:       lambda t,y: numpy.array([y[1],-y[0]]),[1.,0.],(0,10),rtol=1.e-8)
+sage: # output on a fine grid, and zeros of y[0], by interpolation:
+sage: I = RKintegrator(DormandPrince)
+sage: t,Y = I.integrate_adaptive(lambda t,y: numpy.array([y[1],-y[0]]),
+....:       [1.,0.],(0,10),t_eval=numpy.linspace(0,10,1001),
+....:       events=[lambda t,y: y[0]])
+sage: I.t_events
+"""
+from sage.all import *
+from .RKExceptions import ImplicitMethod, NewtonDidNotConverge, \
+    NoEmbeddedMethod
+from .RKformula import RKformula
+import inspect
+import numpy
+import scipy.linalg
+#
+def _factor(M):
+    # factorize M (n x n), or a stack M of such matrices (ensembles).
+    if M.ndim == 2:
+        return scipy.linalg.lu_factor(M)
+    return numpy.linalg.inv(M)
+def _solve(F,r):
+    # solve with a factorization returned by _factor.
+    if isinstance(F,tuple):
+        return scipy.linalg.lu_solve(F,r)
+    return numpy.einsum("...ij,...j->...i",F,r)
+#
+class _Output(object):
+    # collect the solution at the end of the steps, or at the times t_eval
+    # (by dense output), and locate the zeros of the events functions.
+    def __init__(self,I,t0,y0,t_eval,events,args):
+        self.I = I
+        self.t_eval = numpy.asarray(t_eval,dtype=float) \
+            if t_eval is not None else None
+        self.k = 0
+        self.T = []
+        self.Y = []
+        self.events = events if events is not None else []
+        self.args = args
+        self.g = [numpy.asarray(e(t0,y0,*args)) for e in self.events]
+        self.t_events = [[] for e in self.events]
+        self.y_events = [[] for e in self.events]
+        self.i_events = [[] for e in self.events]
+        if self.t_eval is None:
+            self.T.append(t0)
+            self.Y.append(y0)
+        else:
+            self._eval(t0,y0,0,None,None,t0)
+    def _eval(self,t,y,h,kind,X,tn):
+        # the t_eval in [t,tn].
+        m = self.k
+        while m < len(self.t_eval) and self.t_eval[m] <= tn:
+            m+= 1
+        if m > self.k:
+            te = self.t_eval[self.k:m]
+            if h == 0:
+                Ye = [y for x in te]
+            else:
+                Ye = self.I.dense(y,h,kind,X,(te-t)/h)
+            self.T.extend(te)
+            self.Y.extend(Ye)
+            self.k = m
+    def add(self,t,y,h,kind,X,yn):
+        tn = t+h
+        if self.t_eval is None:
+            self.T.append(tn)
+            self.Y.append(yn)
+        else:
+            self._eval(t,y,h,kind,X,tn)
+        for i,e in enumerate(self.events):
+            gn = numpy.asarray(e(tn,yn,*self.args))
+            # the components which change sign (a zero at t was already
+            # found in the previous step):
+            g0 = numpy.ravel(self.g[i])
+            ch = numpy.nonzero((numpy.sign(g0) != 0) &
+                               (numpy.sign(numpy.ravel(gn)) !=
+                                numpy.sign(g0)))[0]
+            Z = sorted((self._locate(e,t,y,h,kind,X,g0,int(k)),int(k))
+                       for k in ch)
+            for th,k in Z:
+                self.t_events[i].append(t+th*h)
+                self.y_events[i].append(self.I.dense(y,h,kind,X,
+                                                     numpy.array([th]))[0])
+                self.i_events[i].append(k)
+            self.g[i] = gn
+    def _locate(self,e,t,y,h,kind,X,g0,k):
+        # bisection on the dense output, for the component k of the event.
+        a,b = 0.,1.
+        sa = numpy.sign(g0[k])
+        for it in range(0,60):
+            c = (a+b)/2
+            gc = numpy.ravel(e(t+c*h,self.I.dense(y,h,kind,X,
+                                                  numpy.array([c]))[0],
+                               *self.args))[k]
+            if numpy.sign(gc) == sa:
+                a = c
+            else:
+                b = c
+            if (b-a)*abs(h) <= 1.e-14*max(1,abs(t)):
+                break
+        return b
+    def result(self):
+        self.I.t_events = [numpy.array(x) for x in self.t_events]
+        self.I.y_events = [numpy.array(x) for x in self.y_events]
+        self.I.i_events = [numpy.array(x,dtype=int) for x in self.i_events]
+        return numpy.array(self.T),numpy.array(self.Y)
+#
+class RKintegrator(SageObject):
+    """
+    Integrate ODEs with the Runge-Kutta method 'method' (a RungeKutta class,
+    or instance), with a fixed time step.
+
+    newton_tol, newton_maxiter: tolerance (relative to 1+|y|) and maximum
+    number of simplified Newton iterations, for implicit methods.
+
+    jacobian_rate: when the rate of convergence of the Newton iterations is
+    worse than this, a new Jacobian is computed for the next step.
+    """
+    def __init__(self,method,newton_tol=1.e-10,newton_maxiter=10,
+                 jacobian_rate=0.1):
+        RK = method() if inspect.isclass(method) else method
+        self.Title = RK.Title
+        s = len(RK.B)
+        self.s = s
+        self.A = numpy.array([[float(RK.A[i,j]) for j in range(0,s)]
+                              for i in range(0,s)])
+        self.B = numpy.array([float(b) for b in RK.B])
+        if len(RK.C) > 0:
+            self.C = numpy.array([float(c) for c in RK.C])
+        else:
+            self.C = self.A.sum(axis=1)
+        # the structure is read on the exact coefficients:
+        self.explicit = all(RK.A[i,j] == 0 for i in range(0,s)
+                            for j in range(i,s))
+        # non zero coefficients of each row of A, and of B:
+        self.rows = [[(j,self.A[i,j]) for j in range(0,s) if RK.A[i,j] != 0]
+                     for i in range(0,s)]
+        self.weights = [(j,self.B[j]) for j in range(0,s) if RK.B[j] != 0]
+        # embedded weights, and weights of the error estimate:
+        Bhat = getattr(RK,"Bhat",None)
+        if Bhat is not None:
+            self.Bhat = numpy.array([float(b) for b in Bhat])
+            self.eweights = [(j,self.B[j]-self.Bhat[j]) for j in range(0,s)
+                             if RK.B[j] != Bhat[j]]
+        else:
+            self.Bhat = None
+        self.method = RK
+        self._orders = None
+        # continuous extension (see set_dense_output):
+        self.Btheta = None
+        self.t_events = []
+        self.y_events = []
+        self.i_events = []
+        self.newton_tol = newton_tol
+        self.newton_maxiter = newton_maxiter
+        self.jacobian_rate = jacobian_rate
+        self._slow = False
+        if self.explicit:
+            self.structure = "explicit"
+        elif all(RK.A[i,j] == 0 for i in range(0,s) for j in range(i+1,s)):
+            self.structure = "diagonal"
+        else:
+            self._transform(RK)
+        # with A invertible, y(t+h) = y + sum d_i Z_i (no more call to f),
+        # and h F = A^(-1) Z (for dense output):
+        if not self.explicit and RK.A.is_invertible():
+            self.Ainv = numpy.linalg.inv(self.A)
+            self.d = numpy.linalg.solve(self.A.T,self.B)
+            if self.Bhat is not None:
+                self.ed = self.d-numpy.linalg.solve(self.A.T,self.Bhat)
+        else:
+            self.Ainv = None
+            self.d = None
+            self.ed = None
+        # first stage of the next step = last stage of this one ?
+        self.fsal = self.explicit and \
+            all(RK.A[s-1,j] == RK.B[j] for j in range(0,s))
+        # Jacobian and factorized Newton matrices (for a time step h):
+        self._J = None
+        self._h = None
+        self._lu = None
+        # counters (one call to f for a whole ensemble):
+        self.reset_counters()
+    def reset_counters(self):
+        """
+        Set to 0 the numbers of calls to f (nfev), of Jacobians (njev), of
+        factorizations (nlu), of Newton iterations (nnewton), and of
+        accepted and rejected steps (naccept, nreject).
+        """
+        self.nfev = 0
+        self.njev = 0
+        self.nlu = 0
+        self.nnewton = 0
+        self.naccept = 0
+        self.nreject = 0
+    def _transform(self,RK):
+        # diagonalize A exactly (see RKformula.A_diagonalization).
+        DP = RKformula(RK).A_diagonalization()
+        if DP is None:
+            self.structure = "full"
+            return
+        self.structure = "transformed"
+        D,P = DP
+        s = self.s
+        lam = [D[k,k] for k in range(0,s)]
+        T = numpy.array([[complex(CDF(P[i,k])) for k in range(0,s)]
+                         for i in range(0,s)])
+        # solve for real eigenvalues, and for one eigenvalue of each pair of
+        # conjugate ones (its eigenvector is conjugated for the other one):
+        self.blocks = []
+        done = set()
+        for k in range(0,s):
+            if k in done:
+                continue
+            done.add(k)
+            if lam[k].imag() == 0:
+                self.blocks.append((k,None))
+            else:
+                l = [m for m in range(0,s) if m not in done and
+                     lam[m] == lam[k].conjugate()][0]
+                done.add(l)
+                T[:,l] = T[:,k].conjugate()
+                self.blocks.append((k,l))
+        self.eigenvalues = numpy.array([complex(CDF(x)) for x in lam])
+        self.T = T
+        self.Tinv = numpy.linalg.inv(T)
+    def _f(self,f,t,y,args):
+        self.nfev+= 1
+        return f(t,y,*args)
+    def jacobian(self,f,t,y,args=()):
+        """
+        Jacobian of f at (t,y), by finite differences (shape (n,n), or
+        (p,n,n) for an ensemble).
+        """
+        self.njev+= 1
+        f0 = self._f(f,t,y,args)
+        n = y.shape[-1]
+        J = numpy.empty(y.shape+(n,))
+        for k in range(0,n):
+            d = 1.e-8*numpy.maximum(1,numpy.abs(y[...,k]))
+            yk = numpy.array(y,dtype=float)
+            yk[...,k]+= d
+            J[...,:,k] = (self._f(f,t,yk,args)-f0)/d[...,numpy.newaxis]
+        return J
+    def _factorize(self,h):
+        # the Newton matrices, for the Jacobian self._J and the step h.
+        J = self._J
+        n = J.shape[-1]
+        Id = numpy.eye(n)
+        self._lu = {}
+        if self.structure == "diagonal":
+            for a in set(self.A[i,i] for i in range(0,self.s)):
+                if a != 0:
+                    self._lu[a] = _factor(Id-(h*a)*J)
+                    self.nlu+= 1
+        elif self.structure == "transformed":
+            for k,l in self.blocks:
+                self._lu[k] = _factor(Id-(h*self.eigenvalues[k])*J)
+                self.nlu+= 1
+        else:
+            s = self.s
+            if J.ndim == 2:
+                M = numpy.kron(self.A,J)
+            else:
+                M = numpy.einsum("ij,pkl->pikjl",self.A,J).reshape(
+                    (J.shape[0],s*n,s*n))
+            self._lu[0] = _factor(numpy.eye(s*n)-h*M)
+            self.nlu+= 1
+        self._h = h
+    def _newton(self,f,t,y,h,args,jac):
+        # make the Jacobian and the factorizations available for (t,y,h).
+        if self._J is None:
+            if jac is not None:
+                self.njev+= 1
+                self._J = jac(t,y,*args)
+            else:
+                self._J = self.jacobian(f,t,y,args)
+            self._h = None
+        if self._h != h:
+            self._factorize(h)
+    def _norm(self,dZ,y):
+        return numpy.max(numpy.abs(dZ)/(1+numpy.abs(y)))
+    def _solve_diagonal(self,f,t,y,h,args):
+        # stages of a DIRK method, one after the other; return the F_i,
+        # or None if the iterations do not converge.
+        F = [None]*self.s
+        for i in range(0,self.s):
+            e = numpy.zeros(y.shape)
+            for j,a in self.rows[i]:
+                if j < i:
+                    e = e+(h*a)*F[j]
+            a = self.A[i,i]
+            if a == 0:
+                F[i] = self._f(f,t+self.C[i]*h,y+e,args)
+                continue
+            z = e
+            prev = None
+            converged = False
+            for it in range(0,self.newton_maxiter):
+                self.nnewton+= 1
+                fz = self._f(f,t+self.C[i]*h,y+z,args)
+                dz = _solve(self._lu[a],e+(h*a)*fz-z)
+                z = z+dz
+                err = self._norm(dz,y)
+                if prev is not None and err > self.jacobian_rate*prev:
+                    self._slow = True
+                if err <= self.newton_tol:
+                    converged = True
+                    break
+                if prev is not None and err >= prev:
+                    break
+                prev = err
+            if not converged:
+                return None
+            # h a_ii f(Y_i) = z_i - e_i:
+            F[i] = (z-e)/(h*a)
+        return F
+    def _solve_coupled(self,f,t,y,h,args):
+        # all the stages at once (transformed or full system); return the
+        # Z_i = Y_i - y, or None if the iterations do not converge.
+        s = self.s
+        Z = numpy.zeros((s,)+y.shape)
+        prev = None
+        for it in range(0,self.newton_maxiter):
+            self.nnewton+= 1
+            F = numpy.stack([self._f(f,t+self.C[i]*h,y+Z[i],args)
+                             for i in range(0,s)])
+            r = h*numpy.tensordot(self.A,F,axes=1)-Z
+            if self.structure == "transformed":
+                W = numpy.tensordot(self.Tinv,r,axes=1)
+                dW = numpy.empty(W.shape,dtype=complex)
+                for k,l in self.blocks:
+                    dW[k] = _solve(self._lu[k],W[k])
+                    if l is not None:
+                        dW[l] = dW[k].conjugate()
+                dZ = numpy.tensordot(self.T,dW,axes=1).real
+            else:
+                # unknowns ordered stage by stage:
+                rr = numpy.moveaxis(r,0,-2).reshape(y.shape[:-1]+(-1,))
+                dZ = numpy.moveaxis(_solve(self._lu[0],rr).reshape(
+                    y.shape[:-1]+(s,y.shape[-1])),-2,0)
+            Z = Z+dZ
+            err = self._norm(dZ,y)
+            if prev is not None and err > self.jacobian_rate*prev:
+                self._slow = True
+            if err <= self.newton_tol:
+                return Z
+            if prev is not None and err >= prev:
+                return None
+            prev = err
+        return None
+    def stages(self,f,t,y,h,args=(),k0=None):
+        """
+        The s stage derivatives K[i] = f(t + c_i h, y + h sum_j a_ij K[j])
+        of an explicit method (k0: f(t,y), if already known).
+        """
+        if not self.explicit:
+            raise ImplicitMethod(self.Title)
+        K = [None]*self.s
+        for i in range(0,self.s):
+            if i == 0 and k0 is not None:
+                K[0] = k0
+                continue
+            Y = y
+            for j,a in self.rows[i]:
+                Y = Y+(h*a)*K[j]
+            K[i] = self._f(f,t+self.C[i]*h,Y,args)
+        return K
+    def _implicit_stages(self,f,t,y,h,args,jac):
+        # solve the stage equations: return ("F",F) (the stage derivatives)
+        # or, if A is invertible, ("Z",Z) (the Z_i = Y_i - y).
+        if self._slow:
+            self._J = None
+            self._slow = False
+        for attempt in range(0,2):
+            self._newton(f,t,y,h,args,jac)
+            if self.structure == "diagonal":
+                F = self._solve_diagonal(f,t,y,h,args)
+                if F is not None:
+                    return "F",F
+            else:
+                Z = self._solve_coupled(f,t,y,h,args)
+                if Z is not None:
+                    if self.d is not None:
+                        return "Z",Z
+                    return "F",[self._f(f,t+self.C[j]*h,y+Z[j],args)
+                                for j in range(0,self.s)]
+            # no convergence: try again with a new Jacobian.
+            self._J = None
+        raise NewtonDidNotConverge(t)
+    def _combine(self,y,h,kind,X,weights,d):
+        # y + h sum_j b_j F_j (weights: the non zero (j,b_j)), or
+        # y + sum_i d_i Z_i.
+        if kind == "Z":
+            return y+numpy.tensordot(d,X,axes=1)
+        yn = numpy.array(y,dtype=float)
+        for j,b in weights:
+            yn+= (h*b)*X[j]
+        return yn
+    def _solve_stages(self,f,t,y,h,args,jac,k0=None):
+        if self.explicit:
+            return "F",self.stages(f,t,y,h,args,k0)
+        return self._implicit_stages(f,t,y,h,args,jac)
+    def implicit_step(self,f,t,y,h,args=(),jac=None):
+        """
+        One step of size h of an implicit method, from (t,y): return
+        y(t+h). jac(t,y,*args), if given, returns the Jacobian of f;
+        otherwise it is computed by finite differences.
+        """
+        kind,X = self._implicit_stages(f,t,y,h,args,jac)
+        return self._combine(y,h,kind,X,self.weights,self.d)
+    def step(self,f,t,y,h,args=(),jac=None):
+        """
+        One step of size h, from (t,y): return y(t+h).
+        """
+        kind,X = self._solve_stages(f,t,y,h,args,jac)
+        return self._combine(y,h,kind,X,self.weights,self.d)
+    def set_dense_output(self,order=None):
+        """
+        Choose the continuous extension b_j(theta) used for dense output:
+        the one of the method (collocation methods), if order is None and
+        there is one; otherwise the one computed by
+        RKformula.dense_output_weights(order) (default order: see
+        RKformula.dense_output_order).
+        """
+        Btheta = getattr(self.method,"Btheta",None)
+        if order is not None or Btheta is None:
+            F = RKformula(self.method)
+            if order is None:
+                order = F.dense_output_order()
+            Btheta = F.dense_output_weights(order)
+        c = [[float(a) for a in b.list()] for b in Btheta]
+        deg = max(len(x) for x in c)
+        self.Btheta = numpy.array([x+[0.]*(deg-len(x)) for x in c])
+    def dense(self,y,h,kind,X,theta):
+        """
+        The solution y(t + theta h) inside the step of size h from (t,y),
+        whose stages are (kind,X) (see _solve_stages), for the values of
+        the array theta; return an array of shape (len(theta),)+y.shape.
+        """
+        if self.Btheta is None:
+            self.set_dense_output()
+        if kind == "Z":
+            F = numpy.tensordot(self.Ainv,X,axes=1)/h
+        else:
+            F = numpy.stack(X)
+        theta = numpy.asarray(theta,dtype=float)
+        bt = numpy.stack([numpy.polynomial.polynomial.polyval(theta,c)
+                          for c in self.Btheta],axis=-1)
+        return y[numpy.newaxis]+h*numpy.tensordot(bt,F,axes=1)
+    def step_with_error(self,f,t,y,h,args=(),jac=None,k0=None):
+        """
+        One step of size h, from (t,y), with the embedded method: return
+        (y(t+h), estimated error, stages (see _solve_stages)); the error is
+        the difference between the solutions of the method and of the
+        embedded method.
+        """
+        if self.Bhat is None:
+            raise NoEmbeddedMethod(self.Title)
+        kind,X = self._solve_stages(f,t,y,h,args,jac,k0)
+        yn = self._combine(y,h,kind,X,self.weights,self.d)
+        e = self._combine(numpy.zeros(y.shape),h,kind,X,self.eweights,
+                          self.ed)
+        return yn,e,(kind,X)
+    def orders(self):
+        """
+        (order, order of the embedded method), computed exactly by
+        RKformula.
+        """
+        if self._orders is None:
+            F = RKformula(self.method)
+            self._orders = (F.order(),F.embedded_order())
+        return self._orders
+    def integrate(self,f,y0,t_span,nsteps,args=(),save=True,jac=None,
+                  t_eval=None,events=None):
+        """
+        Integrate y' = f(t,y,*args) from y(t_span[0]) = y0 to t_span[1],
+        with nsteps steps of the same size.
+
+        y0: array of shape (n,), or (p,n) for an ensemble of p problems.
+
+        jac: Jacobian of f (for implicit methods), jac(t,y,*args) returns
+        an array of shape (n,n), or (p,n,n); default: finite differences.
+
+        Return (t,Y): the nsteps+1 times and the solution at these times
+        (Y[k] is y(t[k])); with save=False, only the final time and
+        solution.
+
+        t_eval: times (increasing) where the solution is wanted, computed
+        by dense output; then (t_eval, solution at t_eval) is returned.
+
+        events: functions e(t,y,*args); their zeros are located by dense
+        output, the times and solutions are in self.t_events[i] and
+        self.y_events[i]. An event may be vector valued (e.g. one value by
+        member of an ensemble): each component which changes sign is
+        located, and its index is in self.i_events[i] (0 for a scalar
+        event). A zero at the end of a step is found once.
+        """
+        t0,t1 = float(t_span[0]),float(t_span[1])
+        h = (t1-t0)/nsteps
+        t = t0+h*numpy.arange(0,nsteps+1)
+        y = numpy.array(y0,dtype=float)
+        self._J = None
+        if t_eval is not None or events is not None:
+            out = _Output(self,t0,y,t_eval,events,args)
+            for k in range(0,nsteps):
+                kind,X = self._solve_stages(f,t[k],y,h,args,jac)
+                yn = self._combine(y,h,kind,X,self.weights,self.d)
+                out.add(t[k],y,h,kind,X,yn)
+                y = yn
+                self.naccept+= 1
+            T,Y = out.result()
+            if save or t_eval is not None:
+                return T,Y
+            return t1,y
+        if save:
+            Y = numpy.empty((nsteps+1,)+y.shape)
+            Y[0] = y
+        for k in range(0,nsteps):
+            y = self.step(f,t[k],y,h,args,jac)
+            self.naccept+= 1
+            if save:
+                Y[k+1] = y
+        if save:
+            return t,Y
+        return t1,y
+    def _error_norm(self,e,y,yn,rtol,atol):
+        # root mean square of the scaled error (maximum over an ensemble).
+        sc = atol+rtol*numpy.maximum(numpy.abs(y),numpy.abs(yn))
+        return numpy.max(numpy.sqrt(numpy.mean((e/sc)**2,axis=-1)))
+    def integrate_adaptive(self,f,y0,t_span,rtol=1.e-6,atol=1.e-8,h0=None,
+                           args=(),jac=None,order=None,hmax=None,
+                           max_steps=100000,t_eval=None,events=None):
+        """
+        Integrate y' = f(t,y,*args) from y(t_span[0]) = y0 to t_span[1],
+        with a step size controlled by the embedded method (the method
+        must have embedded weights Bhat).
+
+        The error estimate is the difference between the two solutions; it
+        is compared to atol + rtol |y| (root mean square norm), and the step
+        size is chosen by a PI controller (see HW II, section IV.2):
+
+        h_new = h * 0.9 * err_n^(-0.7/q) * err_{n-1}^(0.4/q),
+
+        where q = min(p, p_embedded)+1; the orders are computed exactly
+        (see orders()), unless order=(p, p_embedded) is given.
+
+        For an ensemble (y0 of shape (p,n)), all the problems follow the
+        same steps, controlled by the largest error.
+
+        Return (t,Y): the times of the accepted steps and the solution at
+        these times (or t_eval and the solution at t_eval, see integrate).
+        The numbers of accepted and rejected steps are added to self.naccept
+        and self.nreject (see reset_counters). Zeros of the events are
+        located as in integrate.
+        """
+        if self.Bhat is None:
+            raise NoEmbeddedMethod(self.Title)
+        p,ph = order if order is not None else self.orders()
+        q = min(p,ph)+1
+        alpha,beta = 0.7/q,0.4/q
+        t0,t1 = float(t_span[0]),float(t_span[1])
+        hmax = abs(t1-t0) if hmax is None else hmax
+        y = numpy.array(y0,dtype=float)
+        k0 = self._f(f,t0,y,args) if self.explicit else None
+        if h0 is None:
+            # starting step (see HNW I, section II.4):
+            sc = atol+rtol*numpy.abs(y)
+            d0 = numpy.sqrt(numpy.mean((y/sc)**2))
+            d1 = numpy.sqrt(numpy.mean(((k0 if k0 is not None else
+                                         self._f(f,t0,y,args))/sc)**2))
+            h0 = 1.e-6 if d0 < 1.e-5 or d1 < 1.e-5 else 0.01*d0/d1
+        h = min(h0,hmax)
+        self._J = None
+        out = _Output(self,t0,y,t_eval,events,args)
+        t = t0
+        errold = 1.e-4
+        rejected = False
+        nmax = self.naccept+self.nreject+max_steps
+        while t < t1:
+            if self.naccept+self.nreject > nmax:
+                raise RuntimeError("integrate_adaptive: too many steps")
+            h = min(h,t1-t)
+            try:
+                yn,e,(kind,X) = self.step_with_error(f,t,y,h,args,jac,k0)
+            except NewtonDidNotConverge:
+                self.nreject+= 1
+                h = h/2
+                rejected = True
+                continue
+            err = self._error_norm(e,y,yn,rtol,atol)
+            if err <= 1:
+                fac = 0.9*max(err,1.e-10)**(-alpha)*errold**beta
+                fac = min(max(fac,0.2),1 if rejected else 5)
+                if not self.explicit and 1 <= fac <= 1.2:
+                    fac = 1 # keep the factorized matrices.
+                errold = max(err,1.e-4)
+                out.add(t,y,h,kind,X,yn)
+                t = t+h if h < t1-t else t1
+                y = yn
+                self.naccept+= 1
+                rejected = False
+                if self.explicit:
+                    k0 = X[-1] if self.fsal else self._f(f,t,y,args)
+            else:
+                fac = max(0.2,0.9*err**(-1./q))
+                self.nreject+= 1
+                rejected = True
+            h = min(h*fac,hmax)
+        return out.result()
@@ -1,9 +1,207 @@
 from sage.all import *
 from .RKExceptions import GraphicProblem
 from sage.rings.infinity import minus_infinity
+import numpy
+
+def stability_coefficients(RKf):
+    """
+    Coefficients (numpy float arrays, constant term first) of the numerator
+    and of the denominator of the stability function of the formula RKf.
+    """
+    R = RKf.stability_function()
+    N = numpy.array([float(c) for c in R.numerator().list()])
+    D = numpy.array([float(c) for c in R.denominator().list()])
+    return N,D
+
+def _horner(c,Z):
+    # the polynomial of coefficients c (constant term first), on the array Z.
+    V = numpy.full(Z.shape,c[-1],dtype=complex)
+    for a in c[-2::-1]:
+        V = V*Z+a
+    return V
+
+def stability_grid(RKf,xlim,ylim,plot_points=200,type="stab"):
+    r"""
+    Evaluate, on a regular grid of plot_points x plot_points points of
+    the window xlim x ylim, either |R(z)|^2 (type='stab'), or |R(z)e^{-z}|
+    (type='star', the Order star), R being the stability function of RKf.
+
+    The stability function is converted once to floating point coefficients,
+    and evaluated on the whole grid by vectorized Horner schemes.
+
+    Return (x,y,V): x and y are the (1d) coordinates of the grid, and
+    V[j,i] is the value at x[i] + I*y[j] (inf at the poles).
+
+    EXAMPLES::
+
+    sage: x,y,V = stability_grid(RKformula(Radau5()),(-10,10),(-10,10),400)
+    """
+    N,D = stability_coefficients(RKf)
+    x = numpy.linspace(float(xlim[0]),float(xlim[1]),plot_points)
+    y = numpy.linspace(float(ylim[0]),float(ylim[1]),plot_points)
+    Z = x[numpy.newaxis,:]+1j*y[:,numpy.newaxis]
+    with numpy.errstate(divide="ignore",invalid="ignore",over="ignore"):
+        S = _horner(N,Z)/_horner(D,Z)
+        if type == "stab":
+            V = (S*S.conjugate()).real
+        elif type == "star":
+            V = numpy.abs(S*numpy.exp(-Z))
+        else:
+            raise AttributeError("stability_grid: "+type+" :unknown type")
+    V[numpy.isnan(V)] = numpy.inf
+    return x,y,V
+
+def _grid_function(x,y,V):
+    # the function (x,y) -> V at the nearest point of the grid.
+    x0,y0 = x[0],y[0]
+    dx = (x[-1]-x[0])/(len(x)-1)
+    dy = (y[-1]-y[0])/(len(y)-1)
+    nx,ny = len(x)-1,len(y)-1
+    def f(a,b):
+        i = min(max(int(round((a-x0)/dx)),0),nx)
+        j = min(max(int(round((b-y0)/dy)),0),ny)
+        return V[j,i]
+    return f
+
+def _match(prev,cur):
+    # reorder cur, so that cur[k] is (greedily) the closest to prev[k].
+    d = numpy.abs(prev[:,numpy.newaxis]-cur[numpy.newaxis,:])
+    d[numpy.isnan(d)] = numpy.inf
+    m = len(cur)
+    perm = [-1]*m
+    used = [False]*m
+    for f in numpy.argsort(d,axis=None,kind="stable"):
+        i,j = divmod(int(f),m)
+        if perm[i] < 0 and not used[j]:
+            perm[i] = j
+            used[j] = True
+    return cur[perm]
+
+def boundary_locus(RKf,npoints=512,rmax=None):
+    r"""
+    The boundary locus of the stability function R = N/D of RKf: the curve
+    {z : R(z) = e^{i\theta}}, which contains the boundary of the stability
+    region.
+
+    For each of the npoints values of theta, the roots of the polynomial
+    N(z) - e^{i\theta}D(z) are the eigenvalues of its companion matrix (all
+    the companion matrices are solved in one batch); roots are then followed
+    from one theta to the next (continuation), and chained into curves.
+
+    Points farther than rmax from the origin (default: ten times the 90th
+    percentile of the modules of the roots) are considered to be at infinity:
+    they split the curves.
+
+    Return a list of ordered polylines (numpy arrays of complex numbers);
+    a polyline whose last point is its first one is closed.
+
+    EXAMPLES::
+
+    sage: L = boundary_locus(RKformula(RK4()))
+    sage: locus_bounding_box(L)
+    """
+    N,D = stability_coefficients(RKf)
+    m = max(len(N),len(D))-1
+    N = numpy.concatenate([N,numpy.zeros(m+1-len(N))])
+    D = numpy.concatenate([D,numpy.zeros(m+1-len(D))])
+    w = numpy.exp(2j*numpy.pi*numpy.arange(0,npoints+1)/npoints)
+    P = N[numpy.newaxis,:]-w[:,numpy.newaxis]*D[numpy.newaxis,:]
+    # when the leading coefficient vanishes, a root is at infinity:
+    lead = P[:,m]
+    bad = numpy.abs(lead) <= 1.e-13*numpy.abs(P).max(axis=1)
+    lead = numpy.where(bad,1,lead)
+    Cm = numpy.zeros((npoints+1,m,m),dtype=complex)
+    Cm[:,numpy.arange(1,m),numpy.arange(0,m-1)] = 1
+    Cm[:,:,m-1] = numpy.where(bad[:,numpy.newaxis],0,-P[:,:m]/
+                              lead[:,numpy.newaxis])
+    Z = numpy.linalg.eigvals(Cm)
+    Z[bad,:] = numpy.nan
+    if rmax is None:
+        a = numpy.abs(Z[numpy.isfinite(Z)])
+        rmax = 10*numpy.percentile(a,90) if len(a) > 0 else numpy.inf
+    Z[numpy.abs(Z) > rmax] = numpy.nan
+    # continuation:
+    ref = Z[0]
+    for t in range(1,npoints+1):
+        Z[t] = _match(numpy.where(numpy.isnan(Z[t-1]),ref,Z[t-1]),Z[t])
+        ref = numpy.where(numpy.isnan(Z[t]),ref,Z[t])
+    # after one turn, branch k ends where branch perm[k] starts:
+    perm = list(range(0,m))
+    if not numpy.isnan(Z[0]).any():
+        last = _match(Z[0],Z[npoints])
+        for k in range(0,m):
+            j = numpy.nonzero(Z[npoints] == last[k])[0]
+            if len(j) > 0:
+                perm[int(j[0])] = k
+    polylines = []
+    done = [False]*m
+    for k in range(0,m):
+        if done[k]:
+            continue
+        path = []
+        j = k
+        while not done[j]:
+            done[j] = True
+            path.append(Z[:npoints,j])
+            j = perm[j]
+        path.append(Z[:1,k])
+        path = numpy.concatenate(path)
+        # split at the points at infinity:
+        ok = numpy.isfinite(path)
+        start = None
+        for i in range(0,len(path)+1):
+            if i < len(path) and ok[i]:
+                if start is None:
+                    start = i
+            elif start is not None:
+                if i-start > 1:
+                    polylines.append(path[start:i])
+                start = None
+    return polylines
+
+def locus_bounding_box(polylines,margin=0,points=[],rmax=None):
+    """
+    Bounding box ((xmin,xmax),(ymin,ymax)) of a list of polylines (see
+    boundary_locus), of the points (e.g. the poles), and of the origin,
+    enlarged by the factor 1+margin around its center. Points farther than
+    rmax from the origin are brought back, along their direction, at the
+    distance rmax. No side is smaller than a tenth of the other one.
+    """
+    z = numpy.concatenate([numpy.zeros(1,dtype=complex),
+                           numpy.asarray(points,dtype=complex)]
+                          +list(polylines))
+    if rmax is not None:
+        a = numpy.abs(z)
+        z = numpy.where(a > rmax,z*rmax/numpy.where(a > 0,a,1),z)
+    xm,xp = z.real.min(),z.real.max()
+    ym,yp = z.imag.min(),z.imag.max()
+    hx = max((xp-xm)/2,(yp-ym)/20,1.e-8)*(1+margin)
+    hy = max((yp-ym)/2,(xp-xm)/20,1.e-8)*(1+margin)
+    cx,cy = (xp+xm)/2,(yp+ym)/2
+    return (cx-hx,cx+hx),(cy-hy,cy+hy)
+
+def locus_limits(RKf,locus,margin=0):
+    """
+    Window ((xmin,xmax),(ymin,ymax)) around the boundary locus of RKf, its
+    poles and the origin (see locus_bounding_box).
+
+    When the locus is unbounded (some of its polylines are not closed: this
+    happens when deg N = deg D, e.g. for the Gauss methods, where it is the
+    imaginary axis), it is clipped at twice the largest modulus of the
+    poles and of the points of the closed polylines.
+    """
+    N,D = stability_coefficients(RKf)
+    D = numpy.trim_zeros(D,"b")
+    poles = numpy.roots(D[::-1]) if len(D) > 1 else numpy.zeros(0)
+    rmax = None
+    if any(l[0] != l[-1] for l in locus):
+        z = numpy.concatenate([poles]+[l for l in locus if l[0] == l[-1]])
+        if len(z) > 0 and numpy.abs(z).max() > 0:
+            rmax = 2*numpy.abs(z).max()
+    return locus_bounding_box(locus,margin,poles,rmax)
 
 def RKplot(RKf,title="",Enlarge=4,TranslateX=0,
-           ncurves=1,limits=[],fill=False,type="stab"):
+           ncurves=1,limits=[],fill=False,type="stab",plot_points=200):
     r"""
     Plot isovalues of stability function or Order star.
 
@@ -12,10 +210,13 @@ def RKplot(RKf,title="",Enlarge=4,TranslateX=0,
 
     RKf: the formula (instantiation of RKformula).
 
-    Enlarge: plot is done in a window around (0,0) in \mathbb{C}.
+    Enlarge: plot is done in a window around the boundary locus of the
+             stability function (see boundary_locus), its poles, and the
+             origin (see locus_limits).
 
              We can Enlarge the size of the window by this factor (a real
-             positive number).
+             positive number): the window is Enlarge/2 times larger than
+             the bounding box of the locus.
 
     TranslateX : translate the origin in the window along x axis.
 
@@ -26,65 +227,38 @@ def RKplot(RKf,title="",Enlarge=4,TranslateX=0,
 
     fill: to fill the plot (see contour_plot documentation).
 
-    type= 'stab' for stability function (default), 'star' for the Order star.
+    type= 'stab' for stability function (default), 'star' for the Order
+          star, 'locus' for the boundary locus (curves computed by
+          boundary_locus, no grid is used).
+
+    plot_points: number of points of the grid, in each direction (values
+                 are computed by stability_grid), or number of values of
+                 theta for the boundary locus.
 
     """
-    def sf1(x,y,P):
-        s = P(x+QQbar(I)*y)
-        return (s*conjugate(s)).real()
-
-    RDroots = RKf.poles_of_stability_function()
-    Rstab= RKf.stability_on_real_negative_axis()
-
-    # try to compute limits:
-    if Rstab==minus_infinity and RDroots == [] :
-        if limits==[]:
-            raise GraphicProblem(
-                "Cannot find limits. You must define: limits = [(x1,y1),(x2,y2)]")
-        else:
-            raise GraphicProblem("Mthod is not A_stable and no stab. limit is known")
-          
-    else:
+    if type not in ["stab","star","locus"]:
+        raise AttributeError("RKplot: "+type+" :unknown plot type")
+
+    # compute limits, from the boundary locus:
+    if limits == [] or type == "locus":
+        locus = boundary_locus(RKf,max(plot_points,64))
         if limits == []:
-            if len(RDroots) > 0:
-                Lr = max(max([abs(s[0].n().real()) for s in RDroots]), \
-                        max([abs(s[0].n().imag()) for s in RDroots]))
-            else:
-                Lr = 0
-                
-            if Rstab != minus_infinity:
-                L = max(-Rstab,Lr)
-                Lm= -L*Enlarge
-                Lp= -Lm
-            elif RKf.is_A_stable:
-                L = Lr
-                Lm = -Enlarge*L
-                Lp = 3*Enlarge*L/2
-            else:
-                Lm = -L
-                Lp = L
-            
-            L1 = (Lm,Lp)
-            L2 = (-Enlarge*L,Enlarge*L)
-            
-        #
+            if locus == []:
+                raise GraphicProblem(
+                    "Cannot find limits. You must define: limits = [(x1,y1),(x2,y2)]")
+            L1,L2 = locus_limits(RKf,locus,Enlarge/2.-1)
+
     if limits != []:
         L1 = limits[0]
         L2 = limits[1]
 
-    # What to plot:
-    if type ==   "stab":
-        sf = lambda x,y: sf1(x,y,RKf.stability_function())
-    elif type == "star":
-        sf = RKf.order_star_function()
-    else:
-        raise AttributeError("RKplot: "+type+" :unknown plot type")
-
     if title != "":
         stitle =  title
     else:
         if type ==  "stab":
             stitle= "Stability function."
+        elif type == "locus":
+            stitle = "Boundary locus."
         else:
             stitle = "Order star."
             
@@ -92,11 +266,21 @@ def RKplot(RKf,title="",Enlarge=4,TranslateX=0,
     if TranslateX!=0:
         d = (L1[1]-L1[0])*TranslateX/100.
         L1 = (L1[0]-d,L1[1]-d)
-        
+
+    if type == "locus":
+        G = sum([line([(float(z.real),float(z.imag)) for z in l],
+                      axes = True,title = stitle) for l in locus],Graphics())
+        G.set_axes_range(L1[0],L1[1],L2[0],L2[1])
+        return G
+
+    # What to plot (contour_plot samples the same grid):
+    sf = _grid_function(*stability_grid(RKf,L1,L2,plot_points,type))
+
     x = SR.var("x")
     y = SR.var("y")
 
     return contour_plot(sf,(x,L1[0],L1[1]), (y,L2[0],L2[1]),
+                     plot_points = plot_points,
                      contours = [0,1],
                      labels = True,fill = fill, label_inline = True,
                      axes = True,colorbar = True,title = stitle)                 
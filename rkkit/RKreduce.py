@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+r"""
+Reducibility of Runge-Kutta methods (HW II, section IV.12).
+
+- A method is DJ-reducible if some stages do not influence the solution:
+  the stages j such that b_j = 0, and a_ij = 0 for all the stages i which
+  are used, can be removed.
+
+- A method is S-reducible if its stages can be grouped in classes S_1,...,S_r
+  such that, for all classes S_k, S_l, sum_{j in S_l} a_ij is the same for
+  all i in S_k: the stages of a class are equal (for any ODE), and the method
+  is equivalent to the r stages method:
+
+  a_kl = sum_{j in S_l} a_ij (i in S_k),    b_l = sum_{j in S_l} b_j.
+
+Both are detected with exact computations; the irreducible method is
+obtained by removing (DJ), then merging (S) stages, until nothing changes.
+The embedded weights Bhat and the continuous extension Btheta, if any, are
+reduced with B.
+
+EXAMPLES::
+
+sage: R,stage_map = reduced_method(F)
+sage: stage_map   # stage_map[i]: stage of R equal to stage i of F (or None)
+"""
+from sage.all import *
+from .RKRungeKutta import RungeKutta
+#
+def dj_used_stages(A,weights):
+    """
+    The (sorted) list of the stages which influence the solution: those
+    with a non zero weight (in one of the lists 'weights'), and those on
+    which a used stage depends.
+    """
+    s = A.nrows()
+    used = [j for j in range(0,s) if any(w[j] != 0 for w in weights)]
+    k = 0
+    while k < len(used):
+        i = used[k]
+        for j in range(0,s):
+            if A[i,j] != 0 and j not in used:
+                used.append(j)
+        k+= 1
+    return sorted(used)
+def s_partition(A):
+    """
+    The coarsest partition of the stages (a list of sorted lists) such that
+    sum_{j in S_l} a_ij does not depend on i in S_k, for all classes S_k and
+    S_l (refined until it is stable).
+    """
+    s = A.nrows()
+    classes = [list(range(0,s))]
+    while True:
+        new = []
+        for S in classes:
+            # group the stages of S by their sums over the classes:
+            groups = []
+            for i in S:
+                sig = [sum([A[i,j] for j in T]) for T in classes]
+                for g in groups:
+                    if g[0] == sig:
+                        g[1].append(i)
+                        break
+                else:
+                    groups.append((sig,[i]))
+            new+= [g[1] for g in groups]
+        if len(new) == len(classes):
+            return sorted(new)
+        classes = new
+def reduced_method(F):
+    """
+    The irreducible method equivalent to the RungeKutta F, and the map of
+    the stages: stage_map[i] is the stage of the reduced method which is
+    equal to the stage i of F, None if the stage i was removed. If F is
+    irreducible, F itself is returned.
+    """
+    A = F.A
+    B = F.B
+    C = list(F.C)
+    Bhat = getattr(F,"Bhat",None)
+    Btheta = getattr(F,"Btheta",None)
+    s = A.nrows()
+    stage_map = list(range(0,s))
+    while True:
+        W = [list(B)]+([list(Bhat)] if Bhat is not None else [])+\
+            ([list(Btheta)] if Btheta is not None else [])
+        n = A.nrows()
+        # DJ-reducibility:
+        used = dj_used_stages(A,W)
+        if 0 < len(used) < n:
+            new = dict((j,k) for k,j in enumerate(used))
+            A = A.matrix_from_rows_and_columns(used,used)
+            B = vector(B.base_ring(),[B[j] for j in used])
+            if Bhat is not None:
+                Bhat = vector(Bhat.base_ring(),[Bhat[j] for j in used])
+            if Btheta is not None:
+                Btheta = [Btheta[j] for j in used]
+            if C != []:
+                C = [C[j] for j in used]
+            stage_map = [new.get(j) if j is not None else None
+                         for j in stage_map]
+            continue
+        # S-reducibility:
+        P = s_partition(A)
+        if len(P) < n:
+            cls = [None]*n
+            for k,S in enumerate(P):
+                for i in S:
+                    cls[i] = k
+            A = matrix(A.base_ring(),len(P),len(P),
+                       [sum([A[S[0],j] for j in T]) for S in P for T in P])
+            B = vector(B.base_ring(),[sum([B[j] for j in S]) for S in P])
+            if Bhat is not None:
+                Bhat = vector(Bhat.base_ring(),
+                              [sum([Bhat[j] for j in S]) for S in P])
+            if Btheta is not None:
+                Btheta = [sum([Btheta[j] for j in S]) for S in P]
+            if C != []:
+                C = [C[S[0]] for S in P]
+            stage_map = [cls[j] if j is not None else None
+                         for j in stage_map]
+            continue
+        break
+    if A.nrows() == s:
+        return F,stage_map
+    R = RungeKutta(A,B,F.Title+" (reduced)",C,exact=getattr(F,"exact",True),
+                   Bhat=Bhat,Btheta=Btheta)
+    return R,stage_map
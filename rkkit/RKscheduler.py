@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Compute the properties of a RKformula following their dependencies.
+
+The dependencies of each property are declared in
+RKformula.property_dependencies. Properties whose dependencies are known
+are independent of each other, and can be computed concurrently in worker
+processes, if asked for (forked from the current process, so that they already know all
+the computed dependencies); their results, and everything they computed on
+the way, are merged back into known_properties.
+
+EXAMPLES::
+
+sage: F = RKformula(Radau5())
+sage: compute_properties(F,["is_A_stable","order"],processes=4)
+"""
+from sage.all import *
+import os
+import multiprocessing
+from multiprocessing.connection import wait
+#
+def dependencies_closure(deps,names):
+    """
+    The properties needed to compute 'names' (names included), sorted so
+    that every property comes after its dependencies.
+    """
+    order = []
+    seen = set()
+    def visit(p):
+        if p in seen:
+            return
+        seen.add(p)
+        for d in deps.get(p,[]):
+            visit(d)
+        order.append(p)
+    for p in names:
+        visit(p)
+    return order
+def _worker(conn,F,p):
+    # compute p, send back the new entries of known_properties (with the
+    # name of their property: the key, without the arguments).
+    before = set(F.known_properties)
+    ret = []
+    try:
+        getattr(F,p)()
+        for key in F.known_properties:
+            if key not in before:
+                e = F.known_properties.entry(key)
+                try:
+                    ret.append((key.split("(")[0],key,e.time,
+                                dumps(e.value)))
+                except Exception:
+                    pass
+    except Exception:
+        ret = None # the parent will compute it again, and raise.
+    conn.send(ret)
+    conn.close()
+def compute_properties(F,names=None,processes=1):
+    """
+    Compute the properties 'names' (default: F.all_properties) of the
+    RKformula F, and all their dependencies.
+
+    processes: maximum number of worker processes (default: 1, everything is
+    computed in the current process); with processes=None, the number of
+    cores is used.
+    """
+    if names is None:
+        names = F.all_properties
+    if processes is None:
+        processes = os.cpu_count() or 1
+    deps = F.property_dependencies
+    todo = [p for p in dependencies_closure(deps,names)
+            if p not in F.known_properties]
+    if processes <= 1:
+        for p in todo:
+            getattr(F,p)()
+        return
+    ctx = multiprocessing.get_context("fork")
+    running = {} # reader -> (property, process)
+    while todo or running:
+        ready = [p for p in todo
+                 if all(d in F.known_properties for d in deps.get(p,[]))]
+        for p in ready[:max(0,processes-len(running))]:
+            todo.remove(p)
+            r,w = ctx.Pipe(duplex=False)
+            pr = ctx.Process(target=_worker,args=(w,F,p))
+            pr.start()
+            w.close()
+            running[r] = (p,pr)
+        if not running:
+            # dependencies could not be computed (or were evicted): do it here.
+            p = todo.pop(0)
+            getattr(F,p)()
+            continue
+        for r in wait(list(running)):
+            p,pr = running.pop(r)
+            try:
+                ret = r.recv()
+            except EOFError:
+                ret = None
+            pr.join()
+            if ret is None:
+                getattr(F,p)()
+            else:
+                for name,key,t,v in ret:
+                    F.known_properties.store(name,key,loads(v),t)
+                if p not in F.known_properties:
+                    getattr(F,p)()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+r"""
+Fast screening of Runge-Kutta methods, using interval arithmetic.
+
+When exploring thousands of candidate methods, we only need exact proofs
+for the few survivors. RKscreen computes some properties in (certified)
+interval arithmetic (RIF, or RBF): each answer is
+
+- True: definitely yes,
+
+- False: definitely no,
+
+- None: undecided (intervals are too wide to conclude).
+
+Undecided answers can be decided by the exact methods of RKformula (see
+RKscreen.decide), if the coefficients of the method are exact. The order
+is never certified by intervals (has_order is never True): a known order
+can be given to RKscreen, or is recorded when it is decided exactly; it is
+used to cancel the coefficients of E(y) which vanish (see is_A_stable),
+without which A-stability cannot be certified. Methods with
+inexact coefficients (floating point numbers, from an optimizer for
+example) must be built with RungeKutta(...,exact=False).
+
+EXAMPLES::
+
+sage: S = RKscreen(Radau5())
+sage: S.has_order(5), S.has_order(6)
+(None, False)
+sage: S.is_A_stable()
+sage: S.decide("has_order",5)
+True
+sage: S.is_A_stable()
+True
+"""
+from sage.all import *
+from .RKTrees import RKTrees
+from .RKformula import RKformula
+from .RKPolutilities import squared_module_on_imaginary_axis
+#
+def _sign(x):
+    # 1, -1, or None if the interval x contains 0.
+    if x.contains_zero():
+        return None
+    return 1 if x > 0 else -1
+def routh_right_half_plane(c):
+    """
+    Number of roots, in the open right half plane, of the polynomial of
+    (interval) coefficients c (c[k]: coefficient of z^k, c[-1] is the
+    leading one), given by the Routh array; None if it cannot be decided.
+    """
+    n = len(c)-1
+    r0 = [c[n-k] for k in range(0,n+1,2)]
+    r1 = [c[n-k] for k in range(1,n+1,2)]
+    first = [r0[0]]
+    while r1:
+        first.append(r1[0])
+        if _sign(r1[0]) is None:
+            return None
+        r2 = []
+        for j in range(0,len(r0)-1):
+            b = r1[j+1] if j+1 < len(r1) else 0
+            r2.append((r1[0]*r0[j+1]-r0[0]*b)/r1[0])
+        r0,r1 = r1,r2
+    signs = [_sign(x) for x in first]
+    if None in signs:
+        return None
+    return len([k for k in range(0,len(signs)-1) if signs[k] != signs[k+1]])
+#
+class RKscreen(SageObject):
+    r"""
+    Screening of a Runge-Kutta method F, computing in 'field' (RIF or RBF).
+
+    order: the order of F, if it is known (certified), e.g. by construction.
+    """
+    def __init__(self,F,field=RIF,order=None):
+        self.F = F
+        self.field = field
+        self.order = order
+        self.s = len(F.B)
+        self.A = matrix(field,self.s,self.s,[field(a) for a in F.A.list()])
+        self.B = vector(field,[field(b) for b in F.B])
+        self.RTrees = RKTrees()
+        self.exact_formula = None
+        self._coefficients = None
+    def is_explicit(self):
+        """
+        The structure of A (strictly lower triangular) decides.
+        """
+        return all(self.F.A[i,j] == 0 for i in range(0,self.s)
+                   for j in range(i,self.s))
+    def order_residuals(self,p):
+        """
+        The intervals gamma(t)*Phi(t)-1 for the rooted trees t of order p.
+        """
+        return self.RTrees.make_order_equations(self.A,self.B,p)
+    def has_order(self,p):
+        """
+        Does the method have order (at least) p ? False, or None: intervals
+        containing 0 do not prove that the order conditions are satisfied
+        (see decide).
+        """
+        for k in range(1,p+1):
+            if any(not x.contains_zero() for x in self.order_residuals(k)):
+                return False
+        return None
+    def order_upper_bound(self,maxorder=None):
+        """
+        The highest order p <= maxorder (default: 2s) whose conditions are
+        not violated: the order of the method is at most this number.
+        """
+        if maxorder is None:
+            maxorder = 2*self.s
+        p = 0
+        while p < maxorder and \
+              all(x.contains_zero() for x in self.order_residuals(p+1)):
+            p+= 1
+        return p
+    def stability_function_coefficients(self):
+        """
+        Coefficients (intervals) of the numerator N and of the denominator D
+        of the stability function, computed by interpolation of
+        det(I - zA + z 1 B^T) and det(I - zA) at z = 0, ..., s (see
+        RKformula.stability_function_by); N(0) = D(0) = 1 is exact.
+        """
+        if self._coefficients is None:
+            R = PolynomialRing(self.field,'z')
+            K = matrix(self.field,[self.B for i in range(0,self.s)])
+            II = identity_matrix(self.field,self.s)
+            PN = []
+            PD = []
+            for k in range(0,self.s+1):
+                zk = self.field(k)
+                D = II - zk*self.A
+                N = D + zk*K
+                PN.append((zk,N.determinant()))
+                PD.append((zk,D.determinant()))
+            N = R.lagrange_polynomial(PN).list()
+            D = R.lagrange_polynomial(PD).list()
+            N+= [self.field(0)]*(self.s+1-len(N))
+            D+= [self.field(0)]*(self.s+1-len(D))
+            N[0] = D[0] = self.field(1)
+            self._coefficients = (N,D)
+        return self._coefficients
+    def E_polynomial(self):
+        """
+        Coefficients of E(y) = |D(iy)|^2 - |N(iy)|^2 (E is even: its odd
+        coefficients are set to 0). If the method is of order p (see
+        self.order), |R(iy)|^2 - 1 = O(y^{p+1}): the coefficients of
+        y^0, ..., y^p are set to 0.
+        """
+        N,D = self.stability_function_coefficients()
+        R = PolynomialRing(self.field,'y')
+        E = (squared_module_on_imaginary_axis(R(D))-
+             squared_module_on_imaginary_axis(R(N))).list()
+        E+= [self.field(0)]*(2*self.s+1-len(E))
+        p = self.order if self.order is not None else 0
+        return [E[k] if k%2 == 0 and k > p else self.field(0)
+                for k in range(0,len(E))]
+    def is_A_stable(self):
+        """
+        A-stability: the poles of the stability function are in the right
+        half plane (Routh array) and E(y) >= 0 on the real line. True only
+        if the order is known (see E_polynomial), as the low coefficients of
+        E vanish.
+        """
+        if self.is_explicit():
+            return False
+        E = self.E_polynomial()
+        # E < 0 somewhere ?
+        for y in [self.field(2)**k for k in range(-10,11)]:
+            v = sum(E[k]*y**k for k in range(0,len(E)))
+            if v < 0:
+                return False
+        N,D = self.stability_function_coefficients()
+        # poles in the left half plane: roots of D(-z) in the right one.
+        Dm = [D[k]*(-1)**k for k in range(0,len(D))]
+        nl = routh_right_half_plane(Dm)
+        if nl is not None and nl > 0:
+            return False
+        if nl == 0 and all(e >= 0 for e in E):
+            return True
+        return None
+    def is_algebraically_stable(self):
+        """
+        Algebraic stability (see RKformula.is_algebraically_stable): B >= 0
+        and M = (b_i a_ij + b_j a_ji - b_i b_j) positive semidefinite. M is
+        factorized (M = L D L^T): if a pivot, or a principal minor of order
+        1 or 2, is negative, M is not positive semidefinite (False); True
+        only if all the pivots are positive (M is then positive definite).
+        """
+        if self.is_explicit() or any(b < 0 for b in self.B):
+            return False
+        A = self.A
+        B = self.B
+        n = self.s
+        M = matrix(self.field,n,n,[B[i]*A[i,j]+B[j]*A[j,i]-B[i]*B[j]
+                                   for i in range(0,n) for j in range(0,n)])
+        if any(M[i,i] < 0 for i in range(0,n)) or \
+           any(M[i,i]*M[j,j]-M[i,j]**2 < 0 for i in range(0,n)
+               for j in range(i+1,n)):
+            return False
+        for k in range(0,n):
+            d = M[k,k]
+            if d < 0:
+                return False
+            if not d > 0:
+                return None
+            for i in range(k+1,n):
+                l = M[i,k]/d
+                for j in range(k+1,n):
+                    M[i,j]-= l*M[k,j]
+        if all(b >= 0 for b in B):
+            return True
+        return None
+    def stability_on_real_negative_axis(self):
+        """
+        An approximation (in RDF) of the limit of stability on the real
+        negative axis: the largest negative root of N^2 - D^2 (None if no
+        such root is found).
+        """
+        N,D = self.stability_function_coefficients()
+        R = PolynomialRing(RDF,'x')
+        p = R([RDF(c) for c in N])**2-R([RDF(c) for c in D])**2
+        r = [x for x in p.roots(multiplicities=False) if x < 0]
+        return max(r) if r else None
+    def decide(self,name,*args):
+        """
+        Screening answer to the question 'name' (a method of RKscreen); if
+        it is undecided, and the method is exact, ask RKformula.
+        """
+        r = getattr(self,name)(*args)
+        if r is not None or not getattr(self.F,"exact",True):
+            return r
+        if self.exact_formula is None:
+            self.exact_formula = RKformula(self.F)
+        if name == "has_order":
+            r = self.exact_formula.check_order_using_rooted_trees(*args)
+            if r and (self.order is None or self.order < args[0]):
+                # the order is certified: E_polynomial can use it.
+                self.order = args[0]
+            return r
+        return getattr(self.exact_formula,name)(*args)
+def screen(methods,order=None,properties=["is_A_stable"],exact=True):
+    """
+    Screen a list of methods (RungeKutta instances): generate, for each of
+    them which is not rejected, the pair (method, answers), answers being a
+    dictionary of the answers of the 'properties'. A method is rejected as
+    soon as one answer is False; with exact=True, undecided answers are
+    decided by RKformula (see RKscreen.decide).
+    """
+    for F in methods:
+        S = RKscreen(F)
+        ask = S.decide if exact else (lambda n,*a: getattr(S,n)(*a))
+        answers = {}
+        if order is not None:
+            answers["has_order"] = ask("has_order",order)
+            if answers["has_order"] is False:
+                continue
+        for p in properties:
+            answers[p] = ask(p)
+            if answers[p] is False:
+                break
+        if all(a is not False for a in answers.values()):
+            yield F,answers
@@ -2,4 +2,5 @@ from sage.all import *
 from .RKformula import RKformula
 from .RKcolloc import colloc
 from .RKplot import RKplot
-__all__=["RKRungeKutta","RKformula","RKplot","RKcolloc"]
+from .RKintegrate import RKintegrator
+__all__=["RKRungeKutta","RKformula","RKplot","RKcolloc","RKintegrate"]